@@ -7,15 +7,26 @@ discover and use MCP tools just-in-time.
 
 import asyncio
 import logging
-from typing import Any, Callable, Awaitable, Dict, List, Optional
+import sys
+from collections import deque
+from typing import Any, Callable, Awaitable, Deque, Dict, List, Optional
 from dataclasses import dataclass
 
-from jit_mcp.tool_provider import JITToolProvider, create_discover_tool_schema
+from jit_mcp.tool_provider import (
+    DISCOVER_TOOL_SCHEMA,
+    JITToolProvider,
+    create_discover_tool_schema,
+)
+from jit_mcp.context_manager import READ_RESULT_TOOL_SCHEMA, DynamicContextManager
 from jit_mcp.registry import ToolMetadata
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Number of recent messages carried into each follow-up prompt
+HISTORY_WINDOW = 5
+PROMPT_TEMPLATE = "{user_input}\n\nPrevious actions:\n{history}"
+
 
 @dataclass
 class ToolCall:
@@ -53,32 +64,57 @@ class JITAgentLoop:
         """
         self.llm_generate = llm_generate
         self.provider = JITToolProvider(db_path)
+        # Holds large tool results behind handles so prompts stay bounded
+        self.context = DynamicContextManager()
+
+        # Start with only the discovery tool (and a reader for large results)
+        self._base_tools = [create_discover_tool_schema(), READ_RESULT_TOOL_SCHEMA]
 
-        # Start with only the discovery tool
-        self._base_tools = [create_discover_tool_schema()]
+        # Cached base + hydrated tool list, keyed by the provider's tools_version
+        self._current_tools: List[Dict[str, Any]] = []
+        self._current_tools_version = -1
 
     def get_current_tools(self) -> List[Dict[str, Any]]:
-        """Returns all currently available tools (base + hydrated)."""
-        return self._base_tools + self.provider.get_active_tools()
+        """
+        Returns all currently available tools (base + hydrated).
+
+        The list is only rebuilt when the hydrated tools change, so the same
+        list object is returned between hydrations. Treat it as read-only.
+        """
+        version = self.provider.tools_version
+        if version != self._current_tools_version:
+            self._current_tools = self._base_tools + self.provider.get_active_tools()
+            self._current_tools_version = version
+        return self._current_tools
 
     async def add_tool_to_registry(self, tool: ToolMetadata) -> None:
         """Register a tool in the underlying registry."""
         await self.provider.add_tool(tool)
 
+    async def add_tools_to_registry(self, tools: List[ToolMetadata]) -> None:
+        """Register several tools in the underlying registry in one batch."""
+        await self.provider.add_tools(tools)
+
+    async def aclose(self) -> None:
+        """Close the MCP server connections opened during the run."""
+        await self.provider.aclose()
+
     async def run(self, user_input: str, max_turns: int = 10) -> str:
         """
         Run the agent loop until completion or max turns.
 
         Returns the final response from the agent.
         """
-        messages = [f"User: {user_input}"]
+        # Only the last few messages are ever shown to the agent
+        messages: Deque[str] = deque([f"User: {user_input}"], maxlen=HISTORY_WINDOW)
         current_prompt = user_input
 
         for turn in range(max_turns):
-            logger.info(f"Turn {turn + 1}: {len(self.get_current_tools())} tools available")
+            tools = self.get_current_tools()
+            logger.info("Turn %d: %d tools available", turn + 1, len(tools))
 
             # Get agent response
-            response = await self.llm_generate(current_prompt, self.get_current_tools())
+            response = await self.llm_generate(current_prompt, tools)
 
             if response.is_done:
                 return response.content or "Done"
@@ -87,7 +123,7 @@ class JITAgentLoop:
                 tool_name = response.tool_call.name
                 tool_args = response.tool_call.arguments
 
-                logger.info(f"Agent called tool: {tool_name}")
+                logger.info("Agent called tool: %s", tool_name)
 
                 # Handle the special discover_tools call
                 if tool_name == "discover_tools":
@@ -105,11 +141,18 @@ class JITAgentLoop:
                     else:
                         result = f"No tools found for: {query}"
 
+                elif tool_name == "read_result":
+                    result = self.context.read_result(
+                        tool_args.get("handle", ""), int(tool_args.get("offset", 0))
+                    )
+
                 # Handle hydrated MCP tools
                 elif self.provider.is_hydrated(tool_name):
                     try:
-                        result = await self.provider.execute(tool_name, tool_args)
-                        result = str(result)
+                        output = await self.provider.execute(tool_name, tool_args)
+                        # Bounded JSON rather than str(): large outputs are
+                        # truncated and kept behind a read_result handle
+                        result = self.context.format_tool_result(output)
                     except Exception as e:
                         result = f"Error executing {tool_name}: {e}"
 
@@ -118,7 +161,9 @@ class JITAgentLoop:
 
                 # Feed result back to agent
                 messages.append(f"Tool ({tool_name}): {result}")
-                current_prompt = f"{user_input}\n\nPrevious actions:\n" + "\n".join(messages[-5:])
+                current_prompt = PROMPT_TEMPLATE.format(
+                    user_input=user_input, history="\n".join(messages)
+                )
 
             elif response.content:
                 return response.content
@@ -191,17 +236,36 @@ async def create_gemini_generator():
 
     client = genai.Client(api_key=api_key)
 
+    def to_gemini_tool(tool: Dict[str, Any]) -> Any:
+        return types.Tool(
+            function_declarations=[types.FunctionDeclaration(
+                name=tool["name"],
+                description=tool.get("description", ""),
+                parameters=tool.get("input_schema", {})
+            )]
+        )
+
+    # The base tool schemas are shared constants, so convert them only once
+    static_gemini_tools = {
+        id(schema): to_gemini_tool(schema)
+        for schema in (DISCOVER_TOOL_SCHEMA, READ_RESULT_TOOL_SCHEMA)
+    }
+
+    # JITAgentLoop hands back the same tools list until hydration changes it,
+    # so the Gemini conversion only needs to run when the list object changes.
+    converted_from: Optional[List[Dict[str, Any]]] = None
+    gemini_tools: List[Any] = []
+
     async def generate(prompt: str, tools: List[Dict[str, Any]]) -> AgentResponse:
+        nonlocal converted_from, gemini_tools
+
         # Convert tool schemas to Gemini format
-        gemini_tools = []
-        for tool in tools:
-            gemini_tools.append(types.Tool(
-                function_declarations=[types.FunctionDeclaration(
-                    name=tool["name"],
-                    description=tool.get("description", ""),
-                    parameters=tool.get("input_schema", {})
-                )]
-            ))
+        if tools is not converted_from:
+            gemini_tools = [
+                static_gemini_tools.get(id(tool)) or to_gemini_tool(tool)
+                for tool in tools
+            ]
+            converted_from = tools
 
         response = await client.aio.models.generate_content(
             model="gemini-2.0-flash",
@@ -247,22 +311,26 @@ async def example_mock():
     agent = JITAgentLoop(llm_generate=mock_llm.generate)
 
     # Register some tools in the registry
-    await agent.add_tool_to_registry(ToolMetadata(
-        name="finance_tool",
-        description="Access real-time stock prices and financial metrics",
-        uri="mcp+stdio://echo/mock-finance-server",
-        category="Financial"
-    ))
-
-    await agent.add_tool_to_registry(ToolMetadata(
-        name="csv_writer",
-        description="Write data to CSV files",
-        uri="mcp+stdio://echo/mock-csv-server",
-        category="FileOps"
-    ))
+    await agent.add_tools_to_registry([
+        ToolMetadata(
+            name="finance_tool",
+            description="Access real-time stock prices and financial metrics",
+            uri="mcp+stdio://echo/mock-finance-server",
+            category="Financial"
+        ),
+        ToolMetadata(
+            name="csv_writer",
+            description="Write data to CSV files",
+            uri="mcp+stdio://echo/mock-csv-server",
+            category="FileOps"
+        ),
+    ])
 
     # Run the agent
-    result = await agent.run("What is NVIDIA's revenue?")
+    try:
+        result = await agent.run("What is NVIDIA's revenue?")
+    finally:
+        await agent.aclose()
     print(f"\nFinal result: {result}")
 
 
@@ -288,12 +356,20 @@ async def example_gemini():
         category="Search"
     ))
 
-    result = await agent.run("What's the weather in San Francisco?")
+    try:
+        result = await agent.run("What's the weather in San Francisco?")
+    finally:
+        await agent.aclose()
     print(f"\nFinal result: {result}")
 
 
 async def main():
     """Run all examples."""
+    # Python 3.12+: tasks that finish without suspending (e.g. search cache
+    # hits) complete inline instead of waiting for the next loop iteration
+    if sys.version_info >= (3, 12):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
     await example_mock()
 
     # Uncomment to run Gemini example (requires API key)
@@ -301,4 +377,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop is optional: a faster event loop when installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -1,17 +1,25 @@
 from jit_mcp.orchestrator import JITOrchestrator
-from jit_mcp.registry import MCPRegistry, ToolMetadata
-from jit_mcp.tool_provider import JITToolProvider, create_discover_tool_schema
+from jit_mcp.registry import CandidateBatch, MCPRegistry, ToolMetadata, ToolRecord
+from jit_mcp.tool_provider import (
+    DISCOVER_TOOL_SCHEMA,
+    JITToolProvider,
+    create_discover_tool_schema,
+)
 from jit_mcp.search import SearchService
 from jit_mcp.mcp_client import MCPClient
-from jit_mcp.context_manager import DynamicContextManager
+from jit_mcp.context_manager import READ_RESULT_TOOL_SCHEMA, DynamicContextManager
 
 __all__ = [
     "JITOrchestrator",
     "JITToolProvider",
     "MCPRegistry",
     "ToolMetadata",
+    "ToolRecord",
+    "CandidateBatch",
     "SearchService",
     "MCPClient",
     "DynamicContextManager",
     "create_discover_tool_schema",
+    "DISCOVER_TOOL_SCHEMA",
+    "READ_RESULT_TOOL_SCHEMA",
 ]
@@ -0,0 +1,27 @@
+"""JSON helpers backed by orjson, used wherever tool schemas and LLM payloads are (de)serialized."""
+from typing import Any
+
+import orjson
+
+def dumpb(obj: Any) -> bytes:
+    """Serializes `obj` to UTF-8 JSON bytes without an intermediate str."""
+    return orjson.dumps(obj)
+
+def _default(obj: Any) -> Any:
+    # MCP tool results are lists of pydantic content models
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json", exclude_none=True)
+    return str(obj)
+
+def dumpb_any(obj: Any) -> bytes:
+    """
+    Like dumpb(), but never fails: accepts pydantic models and non-str dict
+    keys, and falls back to str() for anything orjson can't encode.
+    """
+    try:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # e.g. ints beyond 64 bits, which `default` is never called for
+        return str(obj).encode()
+
+loads = orjson.loads
@@ -1,30 +1,220 @@
-from typing import List, Dict, Any
+import itertools
+from collections import OrderedDict
+from typing import List, Dict, Any, FrozenSet, Optional, Union
+import google.generativeai as genai
+
+from jit_mcp._json import dumpb, dumpb_any
+from jit_mcp.registry import CandidateBatch
+
+Candidates = Union[CandidateBatch, List[Dict[str, Any]]]
+
+# JSON Schema keys Gemini's Schema message understands, mapped to its field
+# names; MCP servers also emit keys such as "title" and "default" that it rejects
+_GEMINI_SCHEMA_KEYS = {
+    "type": "type",
+    "format": "format",
+    "description": "description",
+    "nullable": "nullable",
+    "enum": "enum",
+    "items": "items",
+    "maxItems": "max_items",
+    "minItems": "min_items",
+    "properties": "properties",
+    "required": "required",
+}
+# The only `format` values Gemini accepts, and only on strings
+_GEMINI_STRING_FORMATS = frozenset({"enum", "date-time"})
+
+DEFAULT_PROMPT_EXTENSION = (
+    "Available tool categories: Financial, Admin, Search, Code, Social. Request tools if needed."
+)
+
+# Tool output longer than this is stored behind a handle instead of being inlined
+MAX_TOOL_OUTPUT_BYTES = 4096
+# Number of stored tool results kept for read_result
+MAX_STORED_RESULTS = 32
+
+READ_RESULT_TOOL_SCHEMA: Dict[str, Any] = {
+    "name": "read_result",
+    "description": (
+        "Read more of a tool result that was too large to show in full. "
+        "Pass the handle from the truncated output and the byte offset to "
+        "continue from."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "handle": {
+                "type": "string",
+                "description": "Result handle, e.g. 'tool_result_1'"
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Byte offset to start reading from (default: 0)",
+                "default": 0
+            }
+        },
+        "required": ["handle"]
+    }
+}
+
+def _to_gemini_schema(
+    schema: Dict[str, Any],
+    defs: Optional[Dict[str, Any]] = None,
+    refs: FrozenSet[str] = frozenset()
+) -> Dict[str, Any]:
+    """
+    Projects a JSON Schema onto the subset Gemini accepts.
+
+    `$ref`s into `$defs` are inlined, and the `anyOf: [X, null]` pydantic
+    emits for Optional fields becomes X with `nullable`. Gemini has no
+    unions, so other `anyOf`/`oneOf`s keep only their first branch.
+    """
+    if defs is None:
+        defs = schema.get("$defs") or schema.get("definitions") or {}
+
+    ref = schema.get("$ref")
+    if isinstance(ref, str):
+        name = ref.rsplit("/", 1)[-1]
+        # A recursive model can't be inlined; it's left as a bare object
+        target = defs.get(name) if name not in refs else None
+        refs = refs | {name}
+        siblings = {key: value for key, value in schema.items() if key != "$ref"}
+        return _to_gemini_schema({**(target or {"type": "object"}), **siblings}, defs, refs)
+
+    variants = schema.get("anyOf") or schema.get("oneOf")
+    if variants:
+        non_null = [v for v in variants if v.get("type") != "null"]
+        siblings = {
+            key: value for key, value in schema.items() if key not in ("anyOf", "oneOf")
+        }
+        collapsed = {**(non_null[0] if non_null else {}), **siblings}
+        if len(non_null) < len(variants):
+            collapsed["nullable"] = True
+        return _to_gemini_schema(collapsed, defs, refs)
+
+    out: Dict[str, Any] = {}
+    for key, value in schema.items():
+        field = _GEMINI_SCHEMA_KEYS.get(key)
+        if field is None:
+            continue
+        if key == "type" and isinstance(value, list):
+            # e.g. ["integer", "null"]
+            types = [t for t in value if t != "null"]
+            if len(types) < len(value):
+                out["nullable"] = True
+            if not types:
+                continue
+            value = types[0]
+        elif key == "properties":
+            value = {name: _to_gemini_schema(prop, defs, refs) for name, prop in value.items()}
+        elif key == "items":
+            value = _to_gemini_schema(value, defs, refs)
+        out[field] = value
+    if "format" in out and (
+        out.get("type") != "string" or out["format"] not in _GEMINI_STRING_FORMATS
+    ):
+        del out["format"]
+    return out
 
 class DynamicContextManager:
     def __init__(self) -> None:
         self.active_tools: List[Dict[str, Any]] = []
-        self.candidate_tools: List[Dict[str, Any]] = []
+        self.candidate_tools: Candidates = []
+        # Comma-joined candidate ids, built once per set_candidates call
+        self._candidate_list_str: Optional[str] = None
+        # Provider-specific views of active_tools, built on first use and
+        # reused until the next hydrate_tools call
+        self._gemini_tools: Optional[List[genai.types.Tool]] = None
+        self._tool_definitions_json: Optional[bytes] = None
+        # handle -> serialized tool result, oldest first
+        self._results: OrderedDict[str, bytes] = OrderedDict()
+        self._result_ids = itertools.count(1)
 
-    def set_candidates(self, tools: List[Dict[str, Any]]) -> None:
-        """Sets the list of candidate tools found during search."""
+    def set_candidates(self, tools: Candidates) -> None:
+        """Sets the candidate tools found during search, as a batch or a list of hits."""
         self.candidate_tools = tools
+        if isinstance(tools, CandidateBatch):
+            self._candidate_list_str = ", ".join(tools.ids)
+        else:
+            self._candidate_list_str = ", ".join([t["id"] for t in tools])
 
     def hydrate_tools(self, tool_names: List[str], full_schemas: List[Dict[str, Any]]) -> None:
         """Loads the full schemas for the confirmed tools."""
         # Simple implementation: replace candidates with full schemas
         self.active_tools = full_schemas
+        self._gemini_tools = None
+        self._tool_definitions_json = None
 
     def get_system_prompt_extension(self) -> str:
         """Returns a prompt extension describing available tool categories or candidates."""
         if not self.candidate_tools and not self.active_tools:
-            return "Available tool categories: Financial, Admin, Search, Code, Social. Request tools if needed."
-        
+            return DEFAULT_PROMPT_EXTENSION
+
         if self.candidate_tools and not self.active_tools:
-            tool_list = ", ".join([t["id"] for t in self.candidate_tools])
-            return f"I found these potential tools: {tool_list}. Shall I load them?"
+            return f"I found these potential tools: {self._candidate_list_str}. Shall I load them?"
 
         return ""
 
     def get_tool_definitions(self) -> List[Dict[str, Any]]:
         """Returns the full JSON-RPC schemas for the active tools."""
         return self.active_tools
+
+    def get_gemini_tools(self) -> List[genai.types.Tool]:
+        """Returns the active tools as Gemini tool objects, built once per hydration."""
+        if self._gemini_tools is None:
+            declarations = [
+                genai.types.FunctionDeclaration(
+                    name=schema["name"],
+                    description=schema.get("description") or "",
+                    parameters=_to_gemini_schema(schema.get("input_schema") or {}) or None
+                )
+                for schema in self.active_tools
+            ]
+            self._gemini_tools = (
+                [genai.types.Tool(function_declarations=declarations)] if declarations else []
+            )
+        return self._gemini_tools
+
+    def get_tool_definitions_json(self) -> bytes:
+        """Returns the active tool schemas as JSON, for providers that take raw JSON."""
+        if self._tool_definitions_json is None:
+            self._tool_definitions_json = dumpb(self.active_tools)
+        return self._tool_definitions_json
+
+    def format_tool_result(self, result: Any, max_bytes: int = MAX_TOOL_OUTPUT_BYTES) -> str:
+        """
+        Serializes a tool result for the next prompt, bounded to `max_bytes`.
+
+        Larger results are kept behind a `tool_result_<n>` handle and only a
+        prefix is returned; the rest can be fetched with read_result().
+        """
+        data = result.encode() if isinstance(result, str) else dumpb_any(result)
+        if len(data) <= max_bytes:
+            return data.decode("utf-8", "replace")
+
+        handle = f"tool_result_{next(self._result_ids)}"
+        self._results[handle] = data
+        while len(self._results) > MAX_STORED_RESULTS:
+            self._results.popitem(last=False)
+        return self._slice(handle, data, 0, max_bytes)
+
+    def read_result(
+        self, handle: str, offset: int = 0, max_bytes: int = MAX_TOOL_OUTPUT_BYTES
+    ) -> str:
+        """Returns up to `max_bytes` of a stored tool result starting at `offset`."""
+        data = self._results.get(handle)
+        if data is None:
+            return f"Unknown result handle: {handle}"
+        return self._slice(handle, data, max(offset, 0), max_bytes)
+
+    @staticmethod
+    def _slice(handle: str, data: bytes, offset: int, max_bytes: int) -> str:
+        end = offset + max_bytes
+        text = data[offset:end].decode("utf-8", "replace")
+        if end < len(data):
+            text += (
+                f"\n[truncated: {len(data) - end} more bytes; "
+                f"call read_result with handle={handle!r}, offset={end}]"
+            )
+        return text
@@ -1,9 +1,10 @@
 import os
-import json
 from typing import List, Dict, Any, Optional
 import google.generativeai as genai
 from pydantic import BaseModel
 
+from jit_mcp._json import loads
+
 class IntentResponse(BaseModel):
     needs_tools: bool
     tool_categories: List[str]
@@ -42,11 +43,14 @@ class LLMProvider:
                 response_schema=IntentResponse
             )
         )
-        return IntentResponse.model_validate_json(response.text)
+        return IntentResponse.model_validate(loads(response.text))
 
-    async def get_tool_calls(self, user_query: str, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def get_tool_calls(self, user_query: str, tools: List[Any]) -> List[Dict[str, Any]]:
         """
         Generates tool calls based on the hydrated tools.
+
+        `tools` may be prebuilt Gemini tools (see
+        DynamicContextManager.get_gemini_tools) or tool dicts.
         """
         # Note: Gemini 1.5 supports native tool calling, but for JIT we might
         # want to inject them as standard tool definitions.
@@ -1,42 +1,185 @@
 import asyncio
-from typing import List, Dict, Any, Optional
-from mcp import ClientSession, StdioServerParameters
+import logging
+from contextlib import AsyncExitStack
+from typing import Awaitable, List, Dict, Any, Optional, Tuple, TypeVar
+
+import anyio
+from mcp import ClientSession, McpError, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.types import CONNECTION_CLOSED
+
+logger = logging.getLogger(__name__)
+
+# (command, args, env, cwd) - identifies one server process
+ServerKey = Tuple[str, Tuple[str, ...], Tuple[Tuple[str, str], ...], Optional[str]]
+
+T = TypeVar("T")
+
+# Errors meaning the connection itself is gone, as opposed to an error reply
+_TRANSPORT_ERRORS = (
+    anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, ConnectionError
+)
+
+
+def _is_transport_error(e: Exception) -> bool:
+    # The SDK fails requests pending when the server exits with this code
+    return isinstance(e, _TRANSPORT_ERRORS) or (
+        isinstance(e, McpError) and e.error.code == CONNECTION_CLOSED
+    )
+
+
+class _PooledSession:
+    """
+    A long-lived stdio connection to one MCP server.
+
+    The stdio transport and ClientSession are built on anyio task groups,
+    which must be entered and exited by the same task. A dedicated runner
+    task therefore opens the connection, parks until aclose(), and tears it
+    down itself.
+    """
+
+    def __init__(self, key: ServerKey, server_params: StdioServerParameters):
+        self.key = key
+        self._ready: asyncio.Future[ClientSession] = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._task = asyncio.create_task(self._run(server_params))
+
+    @property
+    def closed(self) -> bool:
+        return self._task.done()
+
+    async def session(self) -> ClientSession:
+        # Shield so one cancelled waiter doesn't fail the others
+        return await asyncio.shield(self._ready)
+
+    async def request(self, rpc: Awaitable[T]) -> T:
+        """
+        Awaits an RPC on this session. If the session is torn down first the
+        RPC is cancelled and ConnectionError raised: the SDK doesn't reliably
+        wake requests that are pending when its task group is cancelled.
+        """
+        call = asyncio.ensure_future(rpc)
+        try:
+            done, _ = await asyncio.wait((call, self._task), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not call.done():
+                call.cancel()
+        if call in done:
+            return call.result()
+        raise ConnectionError(f"MCP session for {self.key[0]} closed")
+
+    async def aclose(self) -> None:
+        self._closing.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self, server_params: StdioServerParameters) -> None:
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(stdio_client(server_params))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                self._ready.set_result(session)
+                await self._closing.wait()
+        except Exception as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logger.debug("MCP session for %s ended: %s", server_params.command, e)
+        finally:
+            if not self._ready.done():
+                self._ready.cancel()
+
 
 class MCPClient:
     """
     Production-grade MCP Client using the official Python SDK.
     Supports connecting to local servers via stdio.
+
+    Sessions are pooled per server and kept alive until aclose(), so each
+    RPC costs one JSON-RPC round-trip instead of a subprocess spawn and
+    handshake.
     """
-    
+
+    def __init__(self) -> None:
+        self._sessions: Dict[ServerKey, _PooledSession] = {}
+
+    @staticmethod
+    def _key(server_params: StdioServerParameters) -> ServerKey:
+        return (
+            server_params.command,
+            tuple(server_params.args),
+            tuple(sorted((server_params.env or {}).items())),
+            str(server_params.cwd) if server_params.cwd else None,
+        )
+
+    async def _get_session(
+        self, server_params: StdioServerParameters
+    ) -> Tuple[ClientSession, _PooledSession]:
+        """Returns a live session for the server, connecting on first use."""
+        key = self._key(server_params)
+        pooled = self._sessions.get(key)
+        if pooled is None or pooled.closed:
+            # Registered before awaiting so concurrent callers share one spawn
+            pooled = _PooledSession(key, server_params)
+            self._sessions[key] = pooled
+        try:
+            return await pooled.session(), pooled
+        except Exception:
+            await self._discard(pooled)
+            raise
+
+    async def _discard(self, pooled: _PooledSession) -> None:
+        if self._sessions.get(pooled.key) is pooled:
+            del self._sessions[pooled.key]
+        await pooled.aclose()
+
+    async def _discard_if_broken(self, pooled: _PooledSession, error: Exception) -> None:
+        """
+        Drops the session after a transport failure so the next call
+        reconnects. Error replies leave it in place: other calls may still be
+        in flight on it.
+        """
+        if pooled.closed or _is_transport_error(error):
+            await self._discard(pooled)
+
     async def get_tool_schemas(self, server_params: StdioServerParameters) -> List[Dict[str, Any]]:
         """
         Connects to an MCP server and fetches all available tool schemas.
         """
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                tools = await session.list_tools()
-                return [
-                    {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "input_schema": tool.inputSchema
-                    }
-                    for tool in tools.tools
-                ]
+        session, pooled = await self._get_session(server_params)
+        try:
+            tools = await pooled.request(session.list_tools())
+        except Exception as e:
+            await self._discard_if_broken(pooled, e)
+            raise
+        return [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "input_schema": tool.inputSchema
+            }
+            for tool in tools.tools
+        ]
 
     async def execute_tool(
-        self, 
-        server_params: StdioServerParameters, 
-        tool_name: str, 
+        self,
+        server_params: StdioServerParameters,
+        tool_name: str,
         arguments: Dict[str, Any]
     ) -> Any:
         """
         Executes a tool on a specific MCP server.
         """
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                result = await session.call_tool(tool_name, arguments)
-                return result.content
+        session, pooled = await self._get_session(server_params)
+        try:
+            result = await pooled.request(session.call_tool(tool_name, arguments))
+        except Exception as e:
+            await self._discard_if_broken(pooled, e)
+            raise
+        return result.content
+
+    async def aclose(self) -> None:
+        """Closes every pooled session and terminates its server process."""
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*[pooled.aclose() for pooled in sessions])
@@ -1,10 +1,10 @@
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 from mcp import StdioServerParameters
 
-from jit_mcp.registry import MCPRegistry, ToolMetadata
-from jit_mcp.search import SearchService
+from jit_mcp.registry import AnyTool, MCPRegistry
+from jit_mcp.search import SearchService, normalize_query
 from jit_mcp.context_manager import DynamicContextManager
 from jit_mcp.mcp_client import MCPClient
 from jit_mcp.llm_provider import LLMProvider
@@ -23,20 +23,49 @@ class JITOrchestrator:
         self.mcp_client = MCPClient()
         self.llm = LLMProvider(model_name=model_name)
         self.global_categories = ["Financial", "Admin", "Search", "Code", "Social", "FileOps"]
+        # One StdioServerParameters per URI, so equal servers share an object
+        self._params_by_uri: Dict[str, StdioServerParameters] = {}
+        # Tool name -> params of the server whose schema listed it
+        self._tool_to_params: Dict[str, StdioServerParameters] = {}
 
-    async def add_tool_to_registry(self, tool: ToolMetadata) -> None:
+    async def add_tool_to_registry(self, tool: AnyTool) -> None:
         """Helper to register a tool."""
         await self.registry.add_tool(tool)
 
+    async def add_tools_to_registry(self, tools: Sequence[AnyTool]) -> None:
+        """Helper to register several tools in one batch."""
+        await self.registry.add_tools(tools)
+
+    async def aclose(self) -> None:
+        """Close all pooled MCP server connections and the registry."""
+        await self.mcp_client.aclose()
+        await self.registry.aclose()
+
     async def query(self, user_text: str) -> str:
         """
         Production JIT Orchestration Flow.
         """
-        logger.info(f"Processing query: {user_text}")
+        logger.info("Processing query: %s", user_text)
 
-        # Step 1 & 2: Intent Detection via LLM
-        intent = await self.llm.detect_intent(user_text, self.global_categories)
-        logger.info(f"Intent detected: {intent}")
+        # Step 1 & 2: Intent Detection via LLM. Unless its embedding is already
+        # memoized, the user text is embedded speculatively while the LLM
+        # round-trip is in flight.
+        cache = self.search_service.cache
+        speculative = cache.get_embedding(user_text)
+        if speculative is None:
+            intent, embedded = await asyncio.gather(
+                self.llm.detect_intent(user_text, self.global_categories),
+                self.registry.embed_query(user_text),
+                return_exceptions=True
+            )
+            if isinstance(intent, BaseException):
+                raise intent
+            if not isinstance(embedded, BaseException):
+                speculative = embedded
+                cache.put_embedding(user_text, embedded)
+        else:
+            intent = await self.llm.detect_intent(user_text, self.global_categories)
+        logger.info("Intent detected: %s", intent)
 
         if not intent.needs_tools:
             # Fallback to direct LLM response if no tools needed
@@ -44,48 +73,73 @@ class JITOrchestrator:
             return "No tools needed. [Direct Answer Simulation]"
 
         # Step 3: Registry Search
-        logger.info(f"Searching for tools matching: {intent.search_query}")
-        candidates = await self.search_service.search(intent.search_query)
+        logger.info("Searching for tools matching: %s", intent.search_query)
+        # Reuse the speculative embedding when the LLM kept the user's wording
+        same_query = normalize_query(intent.search_query) == normalize_query(user_text)
+        embedding = speculative if same_query else None
+        candidates = await self.search_service.search_batch(
+            intent.search_query, embedding=embedding
+        )
         self.context_manager.set_candidates(candidates)
 
-        if not candidates:
+        if not len(candidates):
             return f"I need tools for '{intent.search_query}' but couldn't find any in the registry."
 
         # Step 4 & 5: Hydration
         # For simplicity, we hydrate all candidates that the LLM might need.
-        full_schemas = []
-        for cand in candidates:
-            uri = cand["metadata"]["uri"]
-            # Parsing URI to StdioServerParameters (Assumption: mcp://command?arg=val)
-            # For this production-grade example, we simulate stdio params.
-            # In a real system, you'd map URI to actual server commands.
-            server_params = self._map_uri_to_params(uri)
-            
-            try:
-                schemas = await self.mcp_client.get_tool_schemas(server_params)
-                full_schemas.extend(schemas)
-            except Exception as e:
-                logger.error(f"Failed to fetch schemas from {uri}: {e}")
-
-        self.context_manager.hydrate_tools([c["id"] for c in candidates], full_schemas)
+        # Each server is a separate stdio handshake, so fetch them concurrently.
+        # Parsing URI to StdioServerParameters (Assumption: mcp://command?arg=val)
+        # For this production-grade example, we simulate stdio params.
+        # In a real system, you'd map URI to actual server commands.
+        # Candidates sharing a server are fetched, and their schemas added, once
+        uris = list(dict.fromkeys(candidates.uris.tolist()))
+        server_params = [self._server_params_for(uri) for uri in uris]
+        schema_results = await asyncio.gather(*[
+            self.mcp_client.get_tool_schemas(params) for params in server_params
+        ], return_exceptions=True)
+
+        full_schemas: List[Dict[str, Any]] = []
+        for uri, params, schemas in zip(uris, server_params, schema_results):
+            if isinstance(schemas, BaseException):
+                logger.error("Failed to fetch schemas from %s: %s", uri, schemas)
+                continue
+            for schema in schemas:
+                self._tool_to_params[schema["name"]] = params
+            full_schemas.extend(schemas)
+
+        self.context_manager.hydrate_tools(candidates.ids.tolist(), full_schemas)
 
         # Step 6: Tool Calling & Execution
-        logger.info(f"Hydrated {len(full_schemas)} tool definitions.")
-        tool_calls = await self.llm.get_tool_calls(user_text, full_schemas)
+        logger.info("Hydrated %d tool definitions.", len(full_schemas))
+        tool_calls = await self.llm.get_tool_calls(
+            user_text, self.context_manager.get_gemini_tools()
+        )
         
         if not tool_calls:
             return "Intent confirmed tools, but model didn't generate any calls."
 
-        # Execute Tool Calls
-        results = []
+        # Execute Tool Calls concurrently
+        calls = []
         for call in tool_calls:
-            # Assuming we can find the right server for the tool name
-            # Real implementation would track which schema came from which server
-            server_params = self._find_server_for_tool(call["name"], candidates)
-            if server_params:
-                res = await self.mcp_client.execute_tool(server_params, call["name"], call["args"])
-                results.append(res)
-        
+            # Route each call to the server whose schema listed the tool
+            server = self._find_server_for_tool(call["name"])
+            if server:
+                calls.append((call, server))
+            else:
+                logger.warning("No hydrated server provides tool %s", call["name"])
+
+        outcomes = await asyncio.gather(*[
+            self.mcp_client.execute_tool(server, call["name"], call["args"])
+            for call, server in calls
+        ], return_exceptions=True)
+
+        results = []
+        for (call, _), res in zip(calls, outcomes):
+            if isinstance(res, BaseException):
+                logger.error("Tool %s failed: %s", call["name"], res)
+                res = f"Error executing {call['name']}: {res}"
+            results.append(res)
+
         return f"Executed {len(tool_calls)} tools. Results: {results}"
 
     def _map_uri_to_params(self, uri: str) -> StdioServerParameters:
@@ -96,6 +150,13 @@ class JITOrchestrator:
         # Mocking for demonstration: replace with real command mapping
         return StdioServerParameters(command="echo", args=["mock-server"])
 
-    def _find_server_for_tool(self, tool_name: str, candidates: List[Dict[str, Any]]) -> Optional[StdioServerParameters]:
-        # Implementation to link tool names back to their servers
-        return self._map_uri_to_params("mcp://default")
+    def _server_params_for(self, uri: str) -> StdioServerParameters:
+        """Returns the interned StdioServerParameters for a URI."""
+        params = self._params_by_uri.get(uri)
+        if params is None:
+            params = self._params_by_uri[uri] = self._map_uri_to_params(uri)
+        return params
+
+    def _find_server_for_tool(self, tool_name: str) -> Optional[StdioServerParameters]:
+        """Links a tool name back to the server it was hydrated from."""
+        return self._tool_to_params.get(tool_name)
@@ -1,96 +1,622 @@
+import asyncio
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import chromadb
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-import anyio
+from chromadb.api.types import Documents, EmbeddingFunction
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+import faiss
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Dict, Any, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background snapshots of changed tools to ChromaDB
+SNAPSHOT_INTERVAL = 5.0
+
+# Chroma HNSW build parameters. The collection is only a snapshot target and
+# is never queried, so these are kept low to make snapshot upserts cheap;
+# Chroma's own defaults (construction_ef=100) favour recall.
+HNSW_CONSTRUCTION_EF = 64
+HNSW_M = 16
+
+# The quantizer's trained per-dimension ranges are widened by this fraction
+# of their width on each side, so most new tools can be added without
+# retraining
+SQ_RANGE_MARGIN = 0.1
+
+# add_tool() calls arriving within this many seconds are written as one batch
+ADD_TOOL_BATCH_WINDOW = 0.005
+# A pending batch is written immediately once it holds this many tools
+ADD_TOOL_BATCH_SIZE = 200
+
+@dataclass(slots=True, frozen=True)
+class ToolRecord:
+    """
+    In-process form of a tool registration.
+
+    Unlike ToolMetadata it is not validated on construction, so trusted
+    bulk-ingestion code can build these directly.
+    """
+    name: str
+    description: str
+    uri: str
+    category: str
+    schema_params: Optional[Dict[str, Any]] = None
 
 class ToolMetadata(BaseModel):
+    """Validated tool registration, for input from outside the process."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     name: str
     description: str
     uri: str
     category: str
     schema_params: Optional[Dict[str, Any]] = None
 
+    def to_record(self) -> ToolRecord:
+        return ToolRecord(
+            name=self.name,
+            description=self.description,
+            uri=self.uri,
+            category=self.category,
+            schema_params=self.schema_params
+        )
+
+AnyTool = Union[ToolRecord, ToolMetadata]
+
+@dataclass(frozen=True)
+class CandidateBatch:
+    """
+    Search hits stored as parallel arrays.
+
+    Entry i of every array describes the same tool, so a consumer that only
+    needs one field (e.g. the URIs to hydrate) scans one array instead of
+    looking the field up in a dict per hit.
+    """
+    ids: np.ndarray
+    uris: np.ndarray
+    categories: np.ndarray
+    documents: np.ndarray
+    scores: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls) -> "CandidateBatch":
+        none = np.empty(0, dtype=object)
+        return cls(none, none, none, none, np.empty(0, dtype=np.float32))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Returns the hits in the list-of-dicts shape used by search_semantic."""
+        # Cosine distance, matching what Chroma used to report. Converted in
+        # one vectorized step, and every column is turned into a plain list
+        # so the zip below doesn't box a numpy scalar per element.
+        distances = (1.0 - self.scores.astype(np.float64)).tolist()
+        return [
+            {
+                "id": tool_id,
+                "metadata": {"name": tool_id, "uri": uri, "category": category},
+                "document": document,
+                "distance": distance,
+            }
+            for tool_id, uri, category, document, distance in zip(
+                self.ids.tolist(),
+                self.uris.tolist(),
+                self.categories.tolist(),
+                self.documents.tolist(),
+                distances
+            )
+        ]
+
+# Chroma call run on the registry's dedicated Chroma thread. A module-level
+# function so no closure is built per call.
+
+def _chroma_upsert(
+    collection: chromadb.Collection,
+    ids: List[str],
+    embeddings: np.ndarray,
+    metadatas: List[Dict[str, Any]],
+    documents: List[str]
+) -> None:
+    collection.upsert(
+        ids=ids,
+        embeddings=embeddings,
+        metadatas=metadatas,  # type: ignore[arg-type]
+        documents=documents
+    )
+
+# Columns mirrored into object arrays, named after the registry's list attributes
+_COLUMNS = ("ids", "uris", "categories", "documents")
+
+@dataclass
+class _PendingBatch:
+    """Tools queued by concurrent add_tool() calls, written with one add_tools()."""
+    tools: List[AnyTool] = field(default_factory=list)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    error: Optional[BaseException] = None
+    timer: Optional[asyncio.TimerHandle] = None
+    writer: Optional["asyncio.Task[None]"] = None
+
 class MCPRegistry:
-    def __init__(self, db_path: str = "./mcp_registry"):
-        self.client = chromadb.PersistentClient(path=db_path)
-        self.collection = self.client.get_or_create_collection(
-            name="mcp_tools",
-            metadata={"hnsw:space": "cosine"}
+    """
+    Tool registry with an in-memory working set and ChromaDB as its
+    on-disk snapshot.
+
+    Row i of the FAISS index corresponds to entry i of the parallel
+    `_ids`, `_uris`, `_categories` and `_documents` columns, so search hits
+    are gathered by position into a CandidateBatch instead of a round-trip
+    through Chroma. Lookups by name or category are served from the same
+    columns.
+
+    Writes only touch memory. Changed tools are upserted into Chroma by
+    snapshot(), which runs every `snapshot_interval` seconds while there
+    are changes and once more in aclose(). The trade-off is durability:
+    tools added since the last snapshot are lost if the process dies
+    without calling aclose(). On startup the registry is restored from the
+    last snapshot.
+
+    The index stores 8-bit scalar-quantized vectors, so a scan reads a
+    quarter of the bytes of float32. The quantizer is trained on the full
+    corpus; new and updated rows are encoded with the existing ranges, and
+    the index is only retrained from the float32 embeddings kept alongside
+    it when a row falls outside them.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "./mcp_registry",
+        embedding_function: Optional[EmbeddingFunction[Documents]] = None,
+        persist: bool = True,
+        snapshot_interval: Optional[float] = SNAPSHOT_INTERVAL
+    ):
+        """
+        Args:
+            db_path: Path to the ChromaDB registry
+            embedding_function: Embeds tool descriptions and queries. Defaults to
+                Chroma's ONNX MiniLM; pass a faster or quantized model here. It
+                must match the one the registry at db_path was built with.
+            persist: If False, the registry lives only in memory and nothing
+                is read from or written to db_path
+            snapshot_interval: Seconds between background snapshots, or None
+                to snapshot only on explicit snapshot() and aclose() calls
+        """
+        self.embedding_function: EmbeddingFunction[Documents] = (
+            embedding_function if embedding_function is not None else DefaultEmbeddingFunction()
         )
+        # Not EphemeralClient for persist=False: its collections are shared by
+        # every client in the process, so two registries would see each other
+        self.client: Optional[chromadb.ClientAPI] = None
+        self.collection: Optional[chromadb.Collection] = None
+        if persist:
+            self.client = chromadb.PersistentClient(path=db_path)
+            self.collection = self.client.get_or_create_collection(
+                name="mcp_tools",
+                # Only applied when the collection is created; an existing
+                # registry keeps the parameters it was built with
+                metadata={
+                    "hnsw:space": "cosine",
+                    "hnsw:construction_ef": HNSW_CONSTRUCTION_EF,
+                    "hnsw:M": HNSW_M,
+                },
+                embedding_function=self.embedding_function  # type: ignore[arg-type]
+            )
+        # Bumped on every write so search-side caches can drop stale results
+        self.version = 0
+        # All Chroma I/O goes through this one thread: calls are serialized
+        # in submission order and never queue behind unrelated pool work
+        self._chroma_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma")
+        self.snapshot_interval = snapshot_interval
+        # Ids changed since the last snapshot, and the periodic snapshot task
+        self._dirty: set[str] = set()
+        self._snapshot_task: Optional["asyncio.Task[None]"] = None
+
+        self.index: Optional[faiss.IndexScalarQuantizer] = None
+        self._ids: List[str] = []
+        self._uris: List[str] = []
+        self._categories: List[str] = []
+        self._documents: List[str] = []
+        self._rows: Dict[str, int] = {}
+        # Embeddings and object-array copies of the columns (for vectorized
+        # gathers) live in buffers with spare rows, so appends are amortized
+        # O(1). `_embeddings` is the view of the rows in use.
+        self._embedding_buffer = np.empty((0, 0), dtype=np.float32)
+        self._embeddings = self._embedding_buffer
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=object) for name in _COLUMNS
+        }
+        # category -> index rows, used to restrict a scan to one category;
+        # the arrays are built from the lists on first use after a change
+        self._category_rows: Dict[str, List[int]] = {}
+        self._category_to_ids: Dict[str, np.ndarray] = {}
+        # Per-dimension value ranges the index's quantizer was trained on
+        self._trained_min = np.empty(0, dtype=np.float32)
+        self._trained_max = np.empty(0, dtype=np.float32)
+        # Batch currently collecting add_tool() calls, and batches being written
+        self._pending: Optional[_PendingBatch] = None
+        self._inflight: List[_PendingBatch] = []
+        self._load_index()
 
-    async def add_tool(self, tool: ToolMetadata) -> None:
-        """Adds or updates a tool in the registry."""
-        await anyio.to_thread.run_sync(
-            lambda: self.collection.upsert(
-                ids=[tool.name],
-                metadatas=[{
-                    "name": tool.name,
-                    "uri": tool.uri,
-                    "category": tool.category
-                }],
-                documents=[tool.description]
+    def _load_index(self) -> None:
+        """Restores the working set from the last Chroma snapshot."""
+        if self.collection is None:
+            return
+        stored = self.collection.get(include=["embeddings", "metadatas", "documents"])
+        if not stored["ids"]:
+            return
+        metadatas = stored["metadatas"] or []
+        self._ids = list(stored["ids"])
+        # Interned: many tools share a category or server URI, and the
+        # columns live as long as the registry
+        self._uris = [sys.intern(str(m["uri"])) for m in metadatas]
+        self._categories = [sys.intern(str(m["category"])) for m in metadatas]
+        self._documents = [d or "" for d in stored["documents"] or []]
+        self._rows = {tool_id: row for row, tool_id in enumerate(self._ids)}
+        embeddings = np.array(stored["embeddings"], dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        self._embedding_buffer = self._embeddings = embeddings
+        self._columns = {
+            name: np.array(getattr(self, f"_{name}"), dtype=object) for name in _COLUMNS
+        }
+        for row, category in enumerate(self._categories):
+            self._category_rows.setdefault(category, []).append(row)
+        self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        """Retrains the quantizer on every embedding and re-adds them."""
+        index = faiss.IndexScalarQuantizer(
+            self._embeddings.shape[1],
+            faiss.ScalarQuantizer.QT_8bit,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.sq.rangestat_arg = SQ_RANGE_MARGIN
+        index.train(self._embeddings)
+        index.add(self._embeddings)
+        self.index = index
+        # QT_8bit's trained parameters are each dimension's min then its width
+        trained = faiss.vector_to_array(index.sq.trained)
+        dim = index.d
+        self._trained_min = trained[:dim]
+        self._trained_max = trained[:dim] + trained[dim:]
+
+    def _in_trained_range(self, embeddings: np.ndarray) -> bool:
+        return bool(
+            ((embeddings >= self._trained_min) & (embeddings <= self._trained_max)).all()
+        )
+
+    def _index_rows(self, updated: List[int], first_new: int) -> None:
+        """
+        Brings the index up to date after rows `updated` were overwritten
+        and rows from `first_new` on were appended.
+        """
+        appended = self._embeddings[first_new:]
+        changed = self._embeddings[updated]
+        if (
+            self.index is None
+            or not self._in_trained_range(appended)
+            or not self._in_trained_range(changed)
+        ):
+            self._rebuild_index()
+            return
+        if updated:
+            # Re-encode in place: the index has no update, and remove_ids
+            # would shift every later row
+            codes = faiss.rev_swig_ptr(self.index.codes.data(), self.index.codes.size())
+            codes.reshape(-1, self.index.code_size)[updated] = self.index.sa_encode(changed)
+        if len(appended):
+            self.index.add(appended)
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        """Grows the column buffers to hold at least `rows` rows."""
+        capacity = len(self._columns["ids"])
+        if rows <= capacity:
+            return
+        capacity = max(rows, 2 * capacity)
+        used = len(self._ids)
+        buffer = np.empty((capacity, dim), dtype=np.float32)
+        if used:
+            buffer[:used] = self._embedding_buffer[:used]
+        self._embedding_buffer = buffer
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=object)
+            grown[:used] = column[:used]
+            self._columns[name] = grown
+
+    def _move_category(self, row: int, old: str, new: str) -> None:
+        self._category_rows[old].remove(row)
+        if not self._category_rows[old]:
+            del self._category_rows[old]
+        self._category_to_ids.pop(old, None)
+        self._add_to_category(row, new)
+
+    def _add_to_category(self, row: int, category: str) -> None:
+        self._category_rows.setdefault(category, []).append(row)
+        self._category_to_ids.pop(category, None)
+
+    def _rows_in_category(self, category: str) -> Optional[np.ndarray]:
+        rows = self._category_to_ids.get(category)
+        if rows is None:
+            category_rows = self._category_rows.get(category)
+            if category_rows is None:
+                return None
+            rows = self._category_to_ids[category] = np.array(category_rows, dtype=np.int64)
+        return rows
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts as a contiguous float32 matrix of unit-length rows."""
+        embeddings = np.array(self.embedding_function(texts), dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def _upsert_rows(
+        self,
+        ids: List[str],
+        metadatas: List[Dict[str, Any]],
+        documents: List[str],
+        embeddings: np.ndarray
+    ) -> None:
+        first_new = len(self._ids)
+        self._reserve(first_new + len(ids), embeddings.shape[1])
+        updated: List[int] = []
+        # Last write wins when a batch repeats an id
+        latest = {tool_id: i for i, tool_id in enumerate(ids)}
+        for tool_id, i in latest.items():
+            uri, category = metadatas[i]["uri"], metadatas[i]["category"]
+            row = self._rows.get(tool_id)
+            if row is None:
+                row = self._rows[tool_id] = len(self._ids)
+                self._ids.append(tool_id)
+                self._uris.append(uri)
+                self._categories.append(category)
+                self._documents.append(documents[i])
+                self._columns["ids"][row] = tool_id
+                self._add_to_category(row, category)
+            else:
+                if category != self._categories[row]:
+                    self._move_category(row, self._categories[row], category)
+                self._uris[row] = uri
+                self._categories[row] = category
+                self._documents[row] = documents[i]
+                updated.append(row)
+            self._columns["uris"][row] = uri
+            self._columns["categories"][row] = category
+            self._columns["documents"][row] = documents[i]
+            self._embedding_buffer[row] = embeddings[i]
+
+        self._embeddings = self._embedding_buffer[:len(self._ids)]
+        self._index_rows(updated, first_new)
+
+    async def add_tool(self, tool: AnyTool) -> None:
+        """
+        Adds or updates a tool in the registry.
+
+        Concurrent calls are coalesced: tools arriving within
+        ADD_TOOL_BATCH_WINDOW of each other are written with a single
+        add_tools() call. Returns once the tool's batch has been written.
+        """
+        batch = self._pending
+        if batch is None:
+            batch = self._pending = _PendingBatch()
+            batch.timer = asyncio.get_running_loop().call_later(
+                ADD_TOOL_BATCH_WINDOW, self._start_batch, batch
             )
+        batch.tools.append(tool)
+        if len(batch.tools) >= ADD_TOOL_BATCH_SIZE:
+            self._start_batch(batch)
+        await batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+
+    async def flush(self) -> None:
+        """Writes any tools queued by add_tool() and waits for in-flight batches."""
+        if self._pending is not None:
+            self._start_batch(self._pending)
+        for batch in list(self._inflight):
+            await batch.done.wait()
+
+    def _start_batch(self, batch: _PendingBatch) -> None:
+        """
+        Takes the batch off the queue and writes it in a task of its own, so
+        a cancelled add_tool() caller can't abandon the other callers' tools.
+        """
+        if batch.writer is not None:
+            return
+        if self._pending is batch:
+            self._pending = None
+        if batch.timer is not None:
+            batch.timer.cancel()
+        self._inflight.append(batch)
+        batch.writer = asyncio.create_task(self._write_batch(batch))
+
+    async def _write_batch(self, batch: _PendingBatch) -> None:
+        try:
+            await self.add_tools(batch.tools)
+        except BaseException as e:
+            batch.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self._inflight.remove(batch)
+            batch.done.set()
+
+    async def add_tools(self, tools: Sequence[AnyTool]) -> None:
+        """
+        Adds or updates several tools with one embedding batch. Accepts
+        ToolRecord or ToolMetadata. The tools are searchable on return and
+        reach Chroma with the next snapshot.
+        """
+        if not tools:
+            return
+        tools = [tool if isinstance(tool, ToolRecord) else tool.to_record() for tool in tools]
+        ids = [tool.name for tool in tools]
+        metadatas: List[Dict[str, Any]] = [
+            # Interned for the same reason as in _load_index
+            {"name": tool.name, "uri": sys.intern(tool.uri), "category": sys.intern(tool.category)}
+            for tool in tools
+        ]
+        documents = [tool.description for tool in tools]
+
+        embeddings = await asyncio.get_running_loop().run_in_executor(
+            None, self._embed, documents
         )
+        self._upsert_rows(ids, metadatas, documents, embeddings)
+        self.version += 1
 
-    async def search_semantic(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Performs semantic search based on tool descriptions."""
-        results = await anyio.to_thread.run_sync(
-            lambda: self.collection.query(
-                query_texts=[query],
-                n_results=n_results
+        if self.collection is not None:
+            self._dirty.update(ids)
+            if self._snapshot_task is None and self.snapshot_interval is not None:
+                self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def snapshot(self) -> None:
+        """Upserts every tool changed since the last snapshot into Chroma."""
+        if self.collection is None or not self._dirty:
+            return
+        # Captured synchronously, so later writes are left for the next
+        # snapshot; the Chroma thread applies snapshots in submission order
+        ids = list(self._dirty)
+        self._dirty.clear()
+        rows = [self._rows[tool_id] for tool_id in ids]
+        metadatas = [
+            {"name": tool_id, "uri": self._uris[row], "category": self._categories[row]}
+            for tool_id, row in zip(ids, rows)
+        ]
+        documents = [self._documents[row] for row in rows]
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._chroma_executor,
+                _chroma_upsert, self.collection, ids, self._embeddings[rows], metadatas, documents
             )
+        except BaseException:
+            # Retried by the next snapshot
+            self._dirty.update(ids)
+            raise
+
+    async def _snapshot_loop(self) -> None:
+        """Snapshots every `snapshot_interval` seconds until nothing is left to write."""
+        assert self.snapshot_interval is not None
+        while self._dirty:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception:
+                logger.exception("Registry snapshot failed")
+        # The next write starts a new loop
+        self._snapshot_task = None
+
+    def has_tool(self, tool_name: str) -> bool:
+        """True if a tool with this name has been registered."""
+        return tool_name in self._rows
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Embeds a query string with the registry's embedding function."""
+        embeddings = await asyncio.get_running_loop().run_in_executor(None, self._embed, [query])
+        return embeddings[0]
+
+    async def search_semantic(
+        self, query: str, n_results: int = 5, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Performs semantic search based on tool descriptions, optionally
+        restricted to one category.
+        """
+        embedding = await self.embed_query(query)
+        return await self.search_by_embedding(embedding, n_results=n_results, category=category)
+
+    async def search_by_embedding(
+        self, embedding: np.ndarray, n_results: int = 5, category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Performs semantic search with a precomputed query embedding."""
+        batch = await self.search_batch(embedding, n_results=n_results, category=category)
+        return batch.to_dicts()
+
+    async def search_batch(
+        self, embedding: np.ndarray, n_results: int = 5, category: Optional[str] = None
+    ) -> CandidateBatch:
+        """Performs semantic search and returns the hits as parallel arrays."""
+        if self.index is None or n_results <= 0:
+            return CandidateBatch.empty()
+
+        params = None
+        eligible = self.index.ntotal
+        if category is not None:
+            category_rows = self._rows_in_category(category)
+            if category_rows is None:
+                return CandidateBatch.empty()
+            # The selector is applied inside the scan, so rows from other
+            # categories are skipped rather than scored and filtered after
+            params = faiss.SearchParameters(sel=faiss.IDSelectorArray(category_rows))  # type: ignore[call-arg]
+            eligible = len(category_rows)
+
+        # An exact scan over the in-memory index is cheap enough to run inline,
+        # which also keeps it on the same thread as index writes.
+        query = np.array(embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        scores, rows = self.index.search(query, min(n_results, eligible), params=params)
+
+        found = rows[0] >= 0
+        rows, scores = rows[0][found], scores[0][found]
+        return CandidateBatch(
+            ids=self._columns["ids"][rows],
+            uris=self._columns["uris"][rows],
+            categories=self._columns["categories"][rows],
+            documents=self._columns["documents"][rows],
+            scores=scores,
         )
-        return self._format_results(results)
 
     async def search_by_category(self, category: str) -> List[Dict[str, Any]]:
-        """Filters tools by category."""
-        results = await anyio.to_thread.run_sync(
-            lambda: self.collection.get(
-                where={"category": category}
+        """
+        Filters tools by category, returning ids and metadata only. Use
+        search_by_category_full() if the descriptions are needed too.
+        """
+        rows = self._rows_in_category(category)
+        if rows is None:
+            return []
+        return [
+            {"id": tool_id, "metadata": {"name": tool_id, "uri": uri, "category": category}}
+            for tool_id, uri in zip(
+                self._columns["ids"][rows].tolist(), self._columns["uris"][rows].tolist()
             )
-        )
-        formatted: List[Dict[str, Any]] = []
-        ids = results.get("ids")
-        metadatas = results.get("metadatas")
-        documents = results.get("documents")
-        
-        if ids and metadatas:
-            for i in range(len(ids)):
-                formatted.append({
-                    "id": ids[i],
-                    "metadata": metadatas[i],
-                    "document": documents[i] if documents and i < len(documents) else ""
-                })
-        return formatted
-
-    def _format_results(self, results: Any) -> List[Dict[str, Any]]:
-        formatted: List[Dict[str, Any]] = []
-        if not results or not results.get("ids"):
-            return formatted
-            
-        ids = results["ids"][0] if isinstance(results["ids"][0], list) else results["ids"]
-        metadatas = results["metadatas"][0] if isinstance(results["metadatas"][0], list) else results["metadatas"]
-        documents = results["documents"][0] if results.get("documents") and isinstance(results["documents"][0], list) else results.get("documents", [])
-        distances = results.get("distances", [[]])[0] if results.get("distances") and isinstance(results["distances"][0], list) else results.get("distances", [])
-
-        for i in range(len(ids)):
-            item: Dict[str, Any] = {
-                "id": ids[i],
-                "metadata": metadatas[i],
-                "document": documents[i] if documents and i < len(documents) else None,
+        ]
+
+    async def search_by_category_full(self, category: str) -> List[Dict[str, Any]]:
+        """Filters tools by category, including each tool's description."""
+        rows = self._rows_in_category(category)
+        if rows is None:
+            return []
+        return [
+            {
+                "id": tool_id,
+                "metadata": {"name": tool_id, "uri": uri, "category": category},
+                "document": document,
             }
-            if distances and i < len(distances):
-                item["distance"] = distances[i]
-            formatted.append(item)
-        return formatted
+            for tool_id, uri, document in zip(
+                self._columns["ids"][rows].tolist(),
+                self._columns["uris"][rows].tolist(),
+                self._columns["documents"][rows].tolist(),
+            )
+        ]
 
     async def get_tool_uri(self, tool_name: str) -> Optional[str]:
         """Retrieves the URI for a specific tool."""
-        result = await anyio.to_thread.run_sync(
-            lambda: self.collection.get(
-                ids=[tool_name]
-            )
-        )
-        if result["metadatas"]:
-            return str(result["metadatas"][0]["uri"])
-        return None
+        row = self._rows.get(tool_name)
+        return self._uris[row] if row is not None else None
+
+    async def get_tool_uris(self, tool_names: List[str]) -> Dict[str, Optional[str]]:
+        """Retrieves the URIs for several tools; None for unknown names."""
+        return {
+            name: self._uris[row] if (row := self._rows.get(name)) is not None else None
+            for name in tool_names
+        }
+
+    async def aclose(self) -> None:
+        """Writes any queued tools, takes a final snapshot and shuts down the Chroma thread."""
+        await self.flush()
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            self._snapshot_task = None
+        await self.snapshot()
+        self._chroma_executor.shutdown(wait=True)
@@ -1,40 +1,212 @@
-from typing import List, Dict, Any, Protocol
-from jit_mcp.registry import MCPRegistry
+import hashlib
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Protocol, Tuple
+
+import numpy as np
+
+from jit_mcp.registry import CandidateBatch, MCPRegistry
+
+# (n_results, category) a cached result was computed for
+Scope = Tuple[int, Optional[str]]
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for caching: lowercased, whitespace collapsed."""
+    return " ".join(query.lower().split())
 
 class SearchProvider(Protocol):
     async def search(self, query: str, **kwargs: Any) -> List[Dict[str, Any]]:
         ...
 
+    async def search_batch(self, query: str, **kwargs: Any) -> CandidateBatch:
+        ...
+
+class EmbeddingCache:
+    """
+    LRU + TTL cache of search results keyed by query text.
+
+    Exact repeats (up to case and whitespace) are found by the SHA-256 of
+    the normalized query without touching the embedding model.
+    Near-duplicates are found by comparing the query embedding against all
+    cached embeddings in one vectorized scan.
+
+    Query embeddings are also memoized on their own. Unlike results, they
+    do not depend on the registry contents, so clear() keeps them.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600.0, threshold: float = 0.97):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        # Registry version the cached results were computed against
+        self.version = 0
+        # key -> (unit query embedding, (n_results, category), results, inserted_at)
+        self._entries: OrderedDict[str, Tuple[np.ndarray, Scope, CandidateBatch, float]] = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        # normalized query -> embedding, LRU only
+        self._query_embeddings: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    @staticmethod
+    def key(query: str, scope: Scope) -> str:
+        n_results, category = scope
+        normalized = normalize_query(query)
+        return hashlib.sha256(f"{n_results}\0{category or ''}\0{normalized}".encode()).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, query: str, n_results: int, category: Optional[str] = None
+    ) -> Optional[CandidateBatch]:
+        """Returns cached results for an exact repeat of `query`."""
+        key = self.key(query, (n_results, category))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[3] > self.ttl:
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def get_similar(
+        self, embedding: np.ndarray, n_results: int, category: Optional[str] = None
+    ) -> Optional[CandidateBatch]:
+        """Returns cached results for the closest query above the cosine threshold."""
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[k][0] for k in self._matrix_keys])
+
+        scores = self._matrix @ self._normalize(embedding)
+        now = time.monotonic()
+        for idx in np.argsort(scores)[::-1]:
+            if scores[idx] < self.threshold:
+                break
+            key = self._matrix_keys[idx]
+            _, scope, results, inserted_at = self._entries[key]
+            if scope == (n_results, category) and now - inserted_at <= self.ttl:
+                self._entries.move_to_end(key)
+                return results
+        return None
+
+    def put(
+        self,
+        query: str,
+        embedding: np.ndarray,
+        n_results: int,
+        results: CandidateBatch,
+        category: Optional[str] = None
+    ) -> None:
+        scope = (n_results, category)
+        key = self.key(query, scope)
+        self._entries[key] = (self._normalize(embedding), scope, results, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+    def get_embedding(self, query: str) -> Optional[np.ndarray]:
+        """Returns the memoized embedding for `query`, if any."""
+        key = normalize_query(query)
+        embedding = self._query_embeddings.get(key)
+        if embedding is not None:
+            self._query_embeddings.move_to_end(key)
+        return embedding
+
+    def put_embedding(self, query: str, embedding: np.ndarray) -> None:
+        key = normalize_query(query)
+        self._query_embeddings[key] = embedding
+        self._query_embeddings.move_to_end(key)
+        while len(self._query_embeddings) > self.maxsize:
+            self._query_embeddings.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drops cached results; memoized query embeddings are kept."""
+        self._entries.clear()
+        self._matrix = None
+
+    def _evict(self, key: str) -> None:
+        del self._entries[key]
+        self._matrix = None
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
 class SemanticSearchProvider:
-    def __init__(self, registry: MCPRegistry):
+    def __init__(self, registry: MCPRegistry, cache: Optional[EmbeddingCache] = None):
         self.registry = registry
+        self.cache = cache if cache is not None else EmbeddingCache()
 
-    async def search(self, query: str, n_results: int = 5, **kwargs: Any) -> List[Dict[str, Any]]:
-        return await self.registry.search_semantic(query, n_results=n_results)
+    async def search(
+        self, query: str, n_results: int = 5, category: Optional[str] = None, **kwargs: Any
+    ) -> List[Dict[str, Any]]:
+        batch = await self.search_batch(query, n_results=n_results, category=category)
+        return batch.to_dicts()
 
-class BM25SearchProvider:
-    def __init__(self, registry: MCPRegistry):
-        self.registry = registry
+    async def search_batch(
+        self,
+        query: str,
+        n_results: int = 5,
+        category: Optional[str] = None,
+        embedding: Optional[np.ndarray] = None,
+        **kwargs: Any
+    ) -> CandidateBatch:
+        """`embedding` may be passed if the caller already embedded `query`."""
+        # Any registry write invalidates every cached result
+        if self.cache.version != self.registry.version:
+            self.cache.clear()
+            self.cache.version = self.registry.version
 
-    async def search(self, query: str, **kwargs: Any) -> List[Dict[str, Any]]:
-        # Fallback to semantic for this implementation
-        return await self.registry.search_semantic(query)
+        results = self.cache.get(query, n_results, category)
+        if results is not None:
+            return results
+
+        if embedding is None:
+            embedding = self.cache.get_embedding(query)
+        if embedding is None:
+            embedding = await self.registry.embed_query(query)
+            self.cache.put_embedding(query, embedding)
+        results = self.cache.get_similar(embedding, n_results, category)
+        if results is not None:
+            return results
+
+        results = await self.registry.search_batch(
+            embedding, n_results=n_results, category=category
+        )
+        self.cache.put(query, embedding, n_results, results, category)
+        return results
 
 class SearchService:
     def __init__(self, registry: MCPRegistry, mode: str = "semantic"):
         self.registry = registry
-        self.mode = mode
+        self.cache = EmbeddingCache()
+        semantic = SemanticSearchProvider(registry, self.cache)
         self._providers: Dict[str, SearchProvider] = {
-            "semantic": SemanticSearchProvider(registry),
-            "bm25": BM25SearchProvider(registry)
+            "semantic": semantic,
+            # No keyword index yet: BM25 mode is served by the semantic
+            # provider directly rather than through a delegating wrapper
+            "bm25": semantic
         }
+        self.mode = mode
+        # Resolved once here and in set_mode, not on every search
+        self._provider = self._providers.get(mode, semantic)
 
     async def search(self, query: str, **kwargs: Any) -> List[Dict[str, Any]]:
-        provider = self._providers.get(self.mode, self._providers["semantic"])
-        return await provider.search(query, **kwargs)
+        return await self._provider.search(query, **kwargs)
+
+    async def search_batch(self, query: str, **kwargs: Any) -> CandidateBatch:
+        """Like search(), but returns the hits as a CandidateBatch."""
+        return await self._provider.search_batch(query, **kwargs)
 
     def set_mode(self, mode: str) -> None:
         if mode in self._providers:
             self.mode = mode
+            self._provider = self._providers[mode]
         else:
             raise ValueError(f"Unsupported search mode: {mode}")
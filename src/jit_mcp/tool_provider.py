@@ -1,8 +1,12 @@
+import asyncio
+import functools
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import re
+import sys
+from typing import AsyncIterator, Dict, List, Any, Optional, Sequence, Tuple
 from mcp import StdioServerParameters
 
-from jit_mcp.registry import MCPRegistry, ToolMetadata
+from jit_mcp.registry import AnyTool, MCPRegistry
 from jit_mcp.search import SearchService
 from jit_mcp.mcp_client import MCPClient
 
@@ -13,6 +17,20 @@ ALLOWED_COMMANDS = frozenset({
     "npx", "node", "python", "python3", "uvx", "uv", "echo",
     "docker", "deno", "bun"
 })
+# Sorted once for the disallowed-command error message
+_ALLOWED_SORTED = tuple(sorted(ALLOWED_COMMANDS))
+
+# Optional scheme, then the command, then "/"-separated args
+_URI_RE = re.compile(r"(?:mcp\+stdio://|mcp://)?(?P<cmd>[^/]*)(?:/(?P<args>.*))?", re.DOTALL)
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_uri(uri: str) -> Tuple[str, Tuple[str, ...]]:
+    """Splits a tool URI into (command, args). Cached, as URIs recur across discover calls."""
+    match = _URI_RE.fullmatch(uri)
+    assert match is not None  # every string matches
+    args = match["args"]
+    return match["cmd"], tuple(args.split("/")) if args is not None else ()
 
 
 class JITToolProvider:
@@ -31,30 +49,45 @@ class JITToolProvider:
         self.search_service = SearchService(self.registry)
         self.mcp_client = MCPClient()
 
-        # Cache: tool_name -> (schema, server_params)
-        self._active_tools: Dict[str, Tuple[Dict[str, Any], StdioServerParameters]] = {}
+        # Active tools: tool_name -> schema, and tool_name -> server_params
+        self._schemas: Dict[str, Dict[str, Any]] = {}
+        self._params: Dict[str, StdioServerParameters] = {}
+        # List view of _schemas.values(), rebuilt lazily after a change
+        self._schemas_list: Optional[List[Dict[str, Any]]] = None
 
         # Track which URIs we've already connected to
         self._hydrated_uris: set[str] = set()
 
-    async def add_tool(self, tool: ToolMetadata) -> None:
+        # uri -> schemas that server returned, for already-hydrated URIs
+        self._uri_to_schemas: Dict[str, List[Dict[str, Any]]] = {}
+
+        # Bumped whenever the set of active tools changes, so callers can
+        # cache anything derived from get_active_tools()
+        self.tools_version = 0
+
+    async def add_tool(self, tool: AnyTool) -> None:
         """Register a tool in the registry."""
         await self.registry.add_tool(tool)
 
+    async def add_tools(self, tools: Sequence[AnyTool]) -> None:
+        """Register several tools in the registry in one batch."""
+        await self.registry.add_tools(tools)
+
     async def discover(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """
         Search for tools matching the query without hydrating them.
         Returns lightweight tool metadata for preview.
         """
-        candidates = await self.search_service.search(query, n_results=n_results)
+        candidates = await self.search_service.search_batch(query, n_results=n_results)
+        # Project straight from the batch columns; no per-hit dict to unpack
         return [
-            {
-                "name": c["id"],
-                "description": c.get("document", ""),
-                "category": c.get("metadata", {}).get("category", ""),
-                "uri": c.get("metadata", {}).get("uri", ""),
-            }
-            for c in candidates
+            {"name": name, "description": document, "category": category, "uri": uri}
+            for name, document, category, uri in zip(
+                candidates.ids.tolist(),
+                candidates.documents.tolist(),
+                candidates.categories.tolist(),
+                candidates.uris.tolist()
+            )
         ]
 
     async def discover_and_hydrate(
@@ -68,73 +101,153 @@ class JITToolProvider:
         Returns a list of complete tool schemas ready for injection into
         an agent's tool set.
         """
-        candidates = await self.search_service.search(query, n_results=n_results)
+        uris = await self._candidate_uris(query, n_results)
 
-        if not candidates:
-            logger.info(f"No tools found for query: {query}")
-            return []
+        # Servers not hydrated yet are independent stdio handshakes, so
+        # connect to them concurrently; already-hydrated ones come from cache
+        pending = [uri for uri in dict.fromkeys(uris) if uri not in self._hydrated_uris]
+        fetched = dict(zip(pending, await asyncio.gather(*[
+            self._hydrate_uri(uri) for uri in pending
+        ])))
 
         hydrated_schemas: List[Dict[str, Any]] = []
+        # Tool names are unique, so candidates sharing a server are deduped by name
+        seen_names: set[str] = set()
+        for uri in uris:
+            schemas = fetched.get(uri)
+            if schemas is None:
+                # Return cached schemas for this server
+                schemas = self._uri_to_schemas.get(uri, [])
+            for schema in schemas:
+                if schema["name"] in seen_names:
+                    continue
+                seen_names.add(schema["name"])
+                hydrated_schemas.append(schema)
 
-        for candidate in candidates:
-            uri = candidate.get("metadata", {}).get("uri", "")
-
-            if not uri:
-                logger.warning(f"Tool {candidate['id']} has no URI, skipping")
-                continue
+        return hydrated_schemas
 
-            # Skip if we've already hydrated this server
-            if uri in self._hydrated_uris:
-                # Return cached schemas for this server
-                for name, (schema, _) in self._active_tools.items():
-                    if schema not in hydrated_schemas:
-                        hydrated_schemas.append(schema)
-                continue
+    async def discover_and_hydrate_iter(
+        self,
+        query: str,
+        n_results: int = 5
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Like discover_and_hydrate(), but yields each schema as soon as its
+        server has been hydrated.
 
-            try:
-                server_params = self._map_uri_to_params(uri)
-                schemas = await self.mcp_client.get_tool_schemas(server_params)
+        Schemas of already-hydrated servers come first, then each new
+        server's schemas in the order the servers respond, so the caller
+        can start on the fastest server's tools. If the caller stops early,
+        hydrations still in flight are cancelled.
+        """
+        uris = await self._candidate_uris(query, n_results)
 
-                for schema in schemas:
-                    tool_name = schema["name"]
-                    self._active_tools[tool_name] = (schema, server_params)
-                    hydrated_schemas.append(schema)
-                    logger.info(f"Hydrated tool: {tool_name}")
+        cached: List[str] = []
+        pending: List[str] = []
+        for uri in dict.fromkeys(uris):
+            (cached if uri in self._hydrated_uris else pending).append(uri)
 
-                self._hydrated_uris.add(uri)
+        seen_names: set[str] = set()
+        tasks: List["asyncio.Task[List[Dict[str, Any]]]"] = []
+        try:
+            # Started before the cached schemas are yielded, so the caller
+            # working on those doesn't hold up the new servers' handshakes
+            tasks = [asyncio.create_task(self._hydrate_uri(uri)) for uri in pending]
+            for uri in cached:
+                for schema in self._uri_to_schemas.get(uri, []):
+                    if schema["name"] not in seen_names:
+                        seen_names.add(schema["name"])
+                        yield schema
+
+            for next_done in asyncio.as_completed(tasks):
+                for schema in await next_done:
+                    if schema["name"] not in seen_names:
+                        seen_names.add(schema["name"])
+                        yield schema
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _candidate_uris(self, query: str, n_results: int) -> List[str]:
+        """Searches for `query` and returns the candidates' server URIs, in rank order."""
+        candidates = await self.search_service.search_batch(query, n_results=n_results)
+
+        if not len(candidates):
+            logger.info("No tools found for query: %s", query)
+            return []
 
-            except Exception as e:
-                logger.error(f"Failed to hydrate tools from {uri}: {e}")
+        uris: List[str] = []
+        for tool_id, uri in zip(candidates.ids.tolist(), candidates.uris.tolist()):
+            if not uri:
+                logger.warning("Tool %s has no URI, skipping", tool_id)
                 continue
+            uris.append(uri)
+        return uris
 
-        return hydrated_schemas
+    async def _hydrate_uri(self, uri: str) -> List[Dict[str, Any]]:
+        """
+        Fetches the tool schemas served at `uri` and caches them as active
+        tools. Returns an empty list if the server can't be reached.
+        """
+        try:
+            server_params = self._map_uri_to_params(uri)
+            schemas = await self.mcp_client.get_tool_schemas(server_params)
+        except Exception as e:
+            logger.error("Failed to hydrate tools from %s: %s", uri, e)
+            return []
+
+        # Checked once rather than per schema: this loop runs for every tool
+        # of every hydrated server
+        log_each = logger.isEnabledFor(logging.INFO)
+        for schema in schemas:
+            self._activate(schema, server_params)
+            if log_each:
+                logger.info("Hydrated tool: %s", schema["name"])
+
+        self._uri_to_schemas[uri] = schemas
+        self._hydrated_uris.add(uri)
+        self.tools_version += 1
+        return schemas
 
     async def hydrate_by_name(self, tool_name: str) -> Optional[Dict[str, Any]]:
         """
         Hydrate a specific tool by name.
         Returns the tool schema if found and hydrated successfully.
         """
-        uri = await self.registry.get_tool_uri(tool_name)
-
-        if not uri:
-            logger.warning(f"Tool {tool_name} not found in registry")
-            return None
+        # Same path as the bulk call, so an already-hydrated server isn't
+        # fetched again
+        return (await self.hydrate_many([tool_name]))[tool_name]
 
-        try:
-            server_params = self._map_uri_to_params(uri)
-            schemas = await self.mcp_client.get_tool_schemas(server_params)
-
-            for schema in schemas:
-                self._active_tools[schema["name"]] = (schema, server_params)
-                if schema["name"] == tool_name:
-                    return schema
+    async def hydrate_many(self, tool_names: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Hydrate several tools by name.
 
-            self._hydrated_uris.add(uri)
+        URIs are fetched with one registry lookup, and each server that isn't
+        hydrated yet is connected to once, concurrently. Returns the schema
+        for each name, or None if it wasn't found or couldn't be hydrated.
+        """
+        # Names that were never registered are rejected without a registry lookup
+        known = [name for name in tool_names if self.registry.has_tool(name)]
+        uris = await self.registry.get_tool_uris(known) if known else {}
 
-        except Exception as e:
-            logger.error(f"Failed to hydrate tool {tool_name}: {e}")
+        pending = [
+            uri for uri in dict.fromkeys(uris.values())
+            if uri and uri not in self._hydrated_uris
+        ]
+        await asyncio.gather(*[self._hydrate_uri(uri) for uri in pending])
 
-        return None
+        hydrated: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(tool_names)
+        for name in tool_names:
+            uri = uris.get(name)
+            if not uri:
+                logger.warning("Tool %s not found in registry", name)
+                continue
+            for schema in self._uri_to_schemas.get(uri, []):
+                if schema["name"] == name:
+                    hydrated[name] = schema
+                    break
+        return hydrated
 
     async def execute(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
         """
@@ -143,38 +256,65 @@ class JITToolProvider:
         Raises:
             KeyError: If the tool has not been hydrated
         """
-        if tool_name not in self._active_tools:
+        server_params = self._params.get(tool_name)
+        if server_params is None:
             raise KeyError(
                 f"Tool '{tool_name}' not found. "
                 f"Call discover_and_hydrate() first. "
-                f"Active tools: {list(self._active_tools.keys())}"
+                f"Active tools: {', '.join(self._schemas)}"
             )
 
-        schema, server_params = self._active_tools[tool_name]
-
-        logger.debug(f"Executing tool: {tool_name} with args: {arguments}")
+        # Guarded: the arguments can be large and are never needed unless
+        # debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Executing tool: %s with args: %s", tool_name, arguments)
         result = await self.mcp_client.execute_tool(server_params, tool_name, arguments)
 
         return result
 
     def get_active_tools(self) -> List[Dict[str, Any]]:
-        """Return all currently hydrated tool schemas."""
-        return [schema for schema, _ in self._active_tools.values()]
+        """
+        Return all currently hydrated tool schemas.
+
+        The same list is returned until the active tools change, so treat
+        it as read-only.
+        """
+        if self._schemas_list is None:
+            self._schemas_list = list(self._schemas.values())
+        return self._schemas_list
 
     def get_active_tool_names(self) -> List[str]:
         """Return names of all currently hydrated tools."""
-        return list(self._active_tools.keys())
+        return list(self._schemas)
 
     def is_hydrated(self, tool_name: str) -> bool:
         """Check if a tool has been hydrated."""
-        return tool_name in self._active_tools
+        return tool_name in self._schemas
+
+    def _activate(self, schema: Dict[str, Any], server_params: StdioServerParameters) -> None:
+        """Adds or replaces an active tool."""
+        # Interned so re-hydrations of a tool reuse one key object, and
+        # lookups with an interned name compare by identity
+        tool_name = sys.intern(schema["name"])
+        self._schemas[tool_name] = schema
+        self._params[tool_name] = server_params
+        self._schemas_list = None
 
     def clear_tools(self) -> None:
         """Clear all hydrated tools from cache."""
-        self._active_tools.clear()
+        self._schemas.clear()
+        self._params.clear()
+        self._schemas_list = None
         self._hydrated_uris.clear()
+        self._uri_to_schemas.clear()
+        self.tools_version += 1
         logger.info("Cleared all active tools")
 
+    async def aclose(self) -> None:
+        """Close all pooled MCP server connections and the registry."""
+        await self.mcp_client.aclose()
+        await self.registry.aclose()
+
     def _map_uri_to_params(self, uri: str) -> StdioServerParameters:
         """
         Maps a tool URI to StdioServerParameters.
@@ -186,31 +326,27 @@ class JITToolProvider:
         Raises:
             ValueError: If the command is not in ALLOWED_COMMANDS
         """
-        # Strip protocol prefix
-        if uri.startswith("mcp+stdio://"):
-            path = uri[len("mcp+stdio://"):]
-        elif uri.startswith("mcp://"):
-            path = uri[len("mcp://"):]
-        else:
-            path = uri
-
-        parts = path.split("/")
-        command = parts[0] if parts else "echo"
-        args = parts[1:] if len(parts) > 1 else []
+        command, args = _parse_uri(uri)
 
         if command not in ALLOWED_COMMANDS:
             raise ValueError(
                 f"Command '{command}' is not in the allowed commands list. "
-                f"Allowed: {sorted(ALLOWED_COMMANDS)}"
+                f"Allowed: {', '.join(_ALLOWED_SORTED)}"
             )
 
-        return StdioServerParameters(command=command, args=args)
+        # A fresh params object per call: StdioServerParameters is mutable,
+        # so only the immutable parse result is shared
+        return StdioServerParameters(command=command, args=list(args))
 
 
+@functools.lru_cache(maxsize=1)
 def create_discover_tool_schema() -> Dict[str, Any]:
     """
     Returns a tool schema for the discovery tool that agents can use
     to bootstrap their tool discovery.
+
+    The schema is built once and the same dict is returned on every call,
+    so adapters can cache conversions by identity. Do not mutate it.
     """
     return {
         "name": "discover_tools",
@@ -237,3 +373,6 @@ def create_discover_tool_schema() -> Dict[str, Any]:
             "required": ["query"]
         }
     }
+
+
+DISCOVER_TOOL_SCHEMA = create_discover_tool_schema()
@@ -1,5 +1,8 @@
+import numpy as np
 import pytest
+import google.generativeai as genai
 from jit_mcp.context_manager import DynamicContextManager
+from jit_mcp.registry import CandidateBatch
 
 def test_context_manager_hydration():
     cm = DynamicContextManager()
@@ -13,3 +16,104 @@ def test_context_manager_hydration():
     
     assert len(cm.get_tool_definitions()) == 1
     assert cm.get_tool_definitions()[0]["name"] == "tool1"
+
+def test_context_manager_accepts_candidate_batch():
+    cm = DynamicContextManager()
+    batch = CandidateBatch(
+        ids=np.array(["tool1", "tool2"], dtype=object),
+        uris=np.array(["mcp://t1", "mcp://t2"], dtype=object),
+        categories=np.array(["Test", "Test"], dtype=object),
+        documents=np.array(["desc1", "desc2"], dtype=object),
+        scores=np.array([0.9, 0.8], dtype=np.float32),
+    )
+    cm.set_candidates(batch)
+
+    assert "tool1, tool2" in cm.get_system_prompt_extension()
+    assert [c["metadata"]["uri"] for c in batch.to_dicts()] == ["mcp://t1", "mcp://t2"]
+
+def test_context_manager_caches_tool_views():
+    cm = DynamicContextManager()
+    schemas = [{
+        "name": "tool1",
+        "description": "full desc",
+        "input_schema": {
+            "type": "object",
+            "title": "tool1Arguments",
+            "properties": {"path": {"type": "string", "title": "Path"}},
+        },
+    }]
+    cm.hydrate_tools(["tool1"], schemas)
+
+    gemini_tools = cm.get_gemini_tools()
+    assert cm.get_gemini_tools() is gemini_tools
+    assert gemini_tools[0].function_declarations[0].name == "tool1"
+    assert b'"tool1"' in cm.get_tool_definitions_json()
+
+    cm.hydrate_tools([], [])
+    assert cm.get_gemini_tools() == []
+    assert cm.get_tool_definitions_json() == b"[]"
+
+def test_context_manager_projects_schemas_for_gemini():
+    cm = DynamicContextManager()
+    cm.hydrate_tools(["search"], [{
+        "name": "search",
+        "description": "Search pages",
+        # As FastMCP/pydantic emit it for Optional, nested-model and URL arguments
+        "input_schema": {
+            "$defs": {
+                "Filter": {
+                    "type": "object",
+                    "title": "Filter",
+                    "properties": {
+                        "site": {"type": "string", "format": "uri", "title": "Site"},
+                        "parent": {"$ref": "#/$defs/Filter"},
+                    },
+                },
+            },
+            "type": "object",
+            "properties": {
+                "limit": {"anyOf": [{"type": "integer"}, {"type": "null"}], "default": None},
+                "since": {"type": ["string", "null"], "format": "date-time"},
+                "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 3},
+                "filter": {"$ref": "#/$defs/Filter", "description": "Result filter"},
+            },
+            "required": ["tags"],
+        },
+    }])
+
+    declaration = cm.get_gemini_tools()[0].function_declarations[0].to_proto()
+    params = declaration.parameters.properties
+    Type = genai.protos.Type
+
+    assert (params["limit"].type_, params["limit"].nullable) == (Type.INTEGER, True)
+    assert (params["since"].type_, params["since"].nullable) == (Type.STRING, True)
+    assert params["since"].format_ == "date-time"
+    assert params["tags"].max_items == 3
+    assert params["filter"].description == "Result filter"
+    site = params["filter"].properties["site"]
+    assert (site.type_, site.format_) == (Type.STRING, "")
+    # The recursive reference is cut off rather than inlined forever
+    parent = params["filter"].properties["parent"]
+    assert parent.type_ == Type.OBJECT
+    assert not parent.properties
+
+def test_context_manager_bounds_tool_results():
+    from mcp.types import TextContent
+
+    cm = DynamicContextManager()
+    small = cm.format_tool_result([TextContent(type="text", text="42")])
+    assert small == '[{"type":"text","text":"42"}]'
+
+    large = cm.format_tool_result({"rows": ["x" * 100] * 100}, max_bytes=64)
+    assert large.startswith('{"rows":["xxx')
+    assert "handle='tool_result_1', offset=64" in large
+
+    rest = cm.read_result("tool_result_1", offset=64, max_bytes=100_000)
+    assert rest.endswith('"]}')
+    assert cm.read_result("tool_result_9").startswith("Unknown result handle")
+
+
+def test_context_manager_formats_non_json_results():
+    cm = DynamicContextManager()
+    assert cm.format_tool_result({1: "a", None: "b"}) == '{"1":"a","null":"b"}'
+    assert cm.format_tool_result([2 ** 70]) == str([2 ** 70])
@@ -0,0 +1,102 @@
+import asyncio
+import sys
+import pytest
+from mcp import McpError, StdioServerParameters
+from jit_mcp.mcp_client import MCPClient
+
+SERVER = '''
+import asyncio
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.exceptions import UrlElicitationRequiredError
+
+mcp = FastMCP("test")
+
+@mcp.tool()
+def add(a: int, b: int) -> int:
+    """Add two numbers."""
+    return a + b
+
+@mcp.tool()
+async def slow_add(a: int, b: int) -> int:
+    """Add two numbers after a delay."""
+    await asyncio.sleep(0.5)
+    return a + b
+
+@mcp.tool()
+def needs_auth() -> str:
+    """Always answers with a JSON-RPC error."""
+    raise UrlElicitationRequiredError([])
+
+mcp.run()
+'''
+
+
+@pytest.fixture
+def server_params(tmp_path):
+    script = tmp_path / "server.py"
+    script.write_text(SERVER)
+    return StdioServerParameters(command=sys.executable, args=[str(script)])
+
+
+@pytest.mark.asyncio
+async def test_session_reused_across_calls(server_params):
+    client = MCPClient()
+    try:
+        schemas = await client.get_tool_schemas(server_params)
+        assert [s["name"] for s in schemas] == ["add", "slow_add", "needs_auth"]
+        session, _ = await client._get_session(server_params)
+
+        result = await client.execute_tool(server_params, "add", {"a": 2, "b": 3})
+        assert result[0].text == "5"
+        assert len(client._sessions) == 1
+        assert (await client._get_session(server_params))[0] is session
+    finally:
+        await client.aclose()
+
+    assert client._sessions == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_connection_not_pooled():
+    client = MCPClient()
+    params = StdioServerParameters(command=sys.executable, args=["-c", "pass"])
+    with pytest.raises(ExceptionGroup) as exc_info:
+        await client.get_tool_schemas(params)
+    assert exc_info.group_contains(McpError, depth=2)
+    assert client._sessions == {}
+
+
+@pytest.mark.asyncio
+async def test_error_reply_keeps_shared_session(server_params):
+    client = MCPClient()
+    try:
+        slow, failing = await asyncio.wait_for(asyncio.gather(
+            client.execute_tool(server_params, "slow_add", {"a": 2, "b": 3}),
+            client.execute_tool(server_params, "needs_auth", {}),
+            return_exceptions=True
+        ), timeout=5)
+
+        assert isinstance(failing, McpError)
+        assert slow[0].text == "5"
+        assert len(client._sessions) == 1
+        assert not next(iter(client._sessions.values())).closed
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_discard_fails_inflight_calls(server_params):
+    client = MCPClient()
+    try:
+        _, pooled = await client._get_session(server_params)
+        call = asyncio.create_task(
+            client.execute_tool(server_params, "slow_add", {"a": 2, "b": 3})
+        )
+        await asyncio.sleep(0.1)
+        await client._discard(pooled)
+
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(call, timeout=5)
+        assert client._sessions == {}
+    finally:
+        await client.aclose()
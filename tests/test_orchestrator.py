@@ -0,0 +1,158 @@
+import pytest
+import pytest_asyncio
+from mcp import StdioServerParameters
+
+from jit_mcp.llm_provider import IntentResponse
+from jit_mcp.orchestrator import JITOrchestrator
+from jit_mcp.registry import ToolMetadata
+
+# Server URI -> tool schemas it lists; "mcp://broken" can't be reached
+SERVERS = {
+    "mcp://finance": [{"name": "get_quote", "description": "Stock quote"}],
+    "mcp://mail": [{"name": "send_mail", "description": "Send an email"}],
+}
+
+
+class StubLLM:
+    def __init__(self, search_query, tool_calls):
+        self.search_query = search_query
+        self.tool_calls = tool_calls
+
+    async def detect_intent(self, user_query, categories):
+        return IntentResponse(
+            needs_tools=True, tool_categories=[], search_query=self.search_query, thought=""
+        )
+
+    async def get_tool_calls(self, user_query, tools):
+        return self.tool_calls
+
+
+class StubMCPClient:
+    def __init__(self):
+        self.fetched = []
+        self.executed = []
+
+    async def get_tool_schemas(self, server_params):
+        uri = server_params.args[0]
+        self.fetched.append(uri)
+        if uri not in SERVERS:
+            raise ConnectionError(f"{uri} unreachable")
+        return SERVERS[uri]
+
+    async def execute_tool(self, server_params, tool_name, arguments):
+        self.executed.append((server_params.args[0], tool_name))
+        if tool_name == "send_mail":
+            raise RuntimeError("mailbox full")
+        return f"{tool_name} ok"
+
+    async def aclose(self):
+        pass
+
+
+@pytest_asyncio.fixture
+async def orchestrator(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    orchestrator = JITOrchestrator(db_path=str(tmp_path / "registry"))
+    orchestrator.mcp_client = StubMCPClient()
+    # One server per URI, told apart by its first argument
+    orchestrator._map_uri_to_params = lambda uri: StdioServerParameters(command="echo", args=[uri])
+    await orchestrator.add_tools_to_registry([
+        ToolMetadata(
+            name=f"{name}_tool",
+            description=f"Get stock prices and send {name} reports",
+            uri=f"mcp://{name}",
+            category="Financial"
+        )
+        for name in ("finance", "mail", "broken")
+    ])
+    yield orchestrator
+    await orchestrator.aclose()
+
+
+@pytest.mark.asyncio
+async def test_calls_routed_to_listing_server(orchestrator):
+    orchestrator.llm = StubLLM("stock prices", [
+        {"name": "get_quote", "args": {"ticker": "NVDA"}},
+        {"name": "send_mail", "args": {}},
+        {"name": "unlisted", "args": {}},
+    ])
+
+    result = await orchestrator.query("stock prices")
+
+    # The unreachable server is skipped, as is the tool no server listed
+    assert orchestrator.mcp_client.executed == [
+        ("mcp://finance", "get_quote"),
+        ("mcp://mail", "send_mail"),
+    ]
+    assert "get_quote ok" in result
+    assert "Error executing send_mail: mailbox full" in result
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search_query, reused", [
+    ("  Stock   PRICES ", True),
+    ("financial reports", False),
+])
+async def test_speculative_embedding_reused_for_same_query(
+    orchestrator, monkeypatch, search_query, reused
+):
+    orchestrator.llm = StubLLM(search_query, [])
+    speculative = []
+    embed_query = orchestrator.registry.embed_query
+
+    async def recording_embed(query):
+        embedding = await embed_query(query)
+        speculative.append(embedding)
+        return embedding
+
+    passed = []
+    search_batch = orchestrator.search_service.search_batch
+
+    async def recording_search(query, **kwargs):
+        passed.append(kwargs.get("embedding"))
+        return await search_batch(query, **kwargs)
+
+    monkeypatch.setattr(orchestrator.registry, "embed_query", recording_embed)
+    monkeypatch.setattr(orchestrator.search_service, "search_batch", recording_search)
+
+    await orchestrator.query("stock prices")
+
+    assert (passed[0] is speculative[0]) is reused
+    if not reused:
+        assert passed[0] is None
+
+
+@pytest.mark.asyncio
+async def test_memoized_query_not_embedded_again(orchestrator, monkeypatch):
+    orchestrator.llm = StubLLM("stock prices", [])
+    embedded = []
+    embed_query = orchestrator.registry.embed_query
+
+    async def recording_embed(query):
+        embedded.append(query)
+        return await embed_query(query)
+
+    monkeypatch.setattr(orchestrator.registry, "embed_query", recording_embed)
+
+    await orchestrator.query("stock prices")
+    await orchestrator.query("Stock prices")
+
+    # Only the first query's speculative embedding runs the model
+    assert embedded == ["stock prices"]
+    assert orchestrator.search_service.cache.get_embedding("stock prices") is not None
+
+@pytest.mark.asyncio
+async def test_shared_server_fetched_once(orchestrator):
+    await orchestrator.add_tool_to_registry(ToolMetadata(
+        name="finance_extra_tool",
+        description="Get stock prices and send finance reports",
+        uri="mcp://finance",
+        category="Financial"
+    ))
+    orchestrator.llm = StubLLM("stock prices", [])
+
+    await orchestrator.query("stock prices")
+
+    assert sorted(orchestrator.mcp_client.fetched) == ["mcp://broken", "mcp://finance", "mcp://mail"]
+    names = [schema["name"] for schema in orchestrator.context_manager.get_tool_definitions()]
+    assert sorted(names) == ["get_quote", "send_mail"]
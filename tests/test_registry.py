@@ -1,6 +1,8 @@
+import asyncio
 import pytest
 import os
-from jit_mcp.registry import MCPRegistry, ToolMetadata
+from pydantic import ValidationError
+from jit_mcp.registry import MCPRegistry, ToolMetadata, ToolRecord
 
 @pytest.fixture
 def temp_registry(tmp_path):
@@ -33,3 +35,355 @@ async def test_get_tool_uri(temp_registry):
     await temp_registry.add_tool(tool)
     uri = await temp_registry.get_tool_uri("test_tool")
     assert uri == "mcp://test"
+
+@pytest.mark.asyncio
+async def test_upsert_replaces_indexed_tool(temp_registry):
+    await temp_registry.add_tool(ToolMetadata(
+        name="test_tool",
+        description="A tool for testing purposes.",
+        uri="mcp://test",
+        category="Test"
+    ))
+    await temp_registry.add_tool(ToolMetadata(
+        name="test_tool",
+        description="Send emails to a mailing list.",
+        uri="mcp://mail",
+        category="Social"
+    ))
+
+    results = await temp_registry.search_semantic("send emails")
+    assert len(results) == 1
+    assert results[0]["metadata"]["uri"] == "mcp://mail"
+
+@pytest.mark.asyncio
+async def test_writes_update_index_without_retraining(temp_registry):
+    mail = "Send emails to a mailing list."
+    await temp_registry.add_tools([
+        ToolMetadata(
+            name="stock_tool",
+            description="Get stock prices and financial data",
+            uri="mcp://stock",
+            category="Financial"
+        ),
+        ToolMetadata(name="mail_tool", description=mail, uri="mcp://mail", category="Social"),
+    ])
+    index = temp_registry.index
+
+    # Both embeddings lie inside the ranges the quantizer was trained on
+    await temp_registry.add_tools([
+        ToolMetadata(name="mail_copy", description=mail, uri="mcp://mail", category="Social"),
+        ToolMetadata(name="stock_tool", description=mail, uri="mcp://mail", category="Social"),
+    ])
+
+    assert temp_registry.index is index
+    assert index.ntotal == 3
+    results = await temp_registry.search_semantic("send emails", n_results=3, category="Social")
+    assert {r["id"] for r in results} == {"stock_tool", "mail_tool", "mail_copy"}
+    assert len({round(r["distance"], 3) for r in results}) == 1
+    assert await temp_registry.search_by_category("Financial") == []
+
+@pytest.mark.asyncio
+async def test_index_rebuilt_from_persisted_registry(tmp_path):
+    db_path = str(tmp_path / "test_mcp_registry")
+    registry = MCPRegistry(db_path=db_path)
+    await registry.add_tool(ToolMetadata(
+        name="test_tool",
+        description="A tool for testing purposes.",
+        uri="mcp://test",
+        category="Test"
+    ))
+    await registry.aclose()
+
+    reopened = MCPRegistry(db_path=db_path)
+    results = await reopened.search_semantic("testing purposes")
+    assert [r["id"] for r in results] == ["test_tool"]
+
+@pytest.mark.asyncio
+async def test_writes_reach_chroma_on_snapshot(tmp_path):
+    db_path = str(tmp_path / "test_mcp_registry")
+    registry = MCPRegistry(db_path=db_path, snapshot_interval=None)
+    await registry.add_tool(ToolMetadata(
+        name="test_tool",
+        description="A tool for testing purposes.",
+        uri="mcp://test",
+        category="Test"
+    ))
+
+    # Served from memory before the snapshot
+    assert await registry.get_tool_uri("test_tool") == "mcp://test"
+    assert registry.collection.count() == 0
+
+    await registry.snapshot()
+    assert registry.collection.count() == 1
+    assert MCPRegistry(db_path=db_path).has_tool("test_tool")
+
+@pytest.mark.asyncio
+async def test_periodic_snapshot(tmp_path):
+    registry = MCPRegistry(db_path=str(tmp_path / "registry"), snapshot_interval=0.01)
+    await registry.add_tool(ToolMetadata(
+        name="test_tool",
+        description="A tool for testing purposes.",
+        uri="mcp://test",
+        category="Test"
+    ))
+    for _ in range(100):
+        if registry._snapshot_task is None:
+            break
+        await asyncio.sleep(0.01)
+
+    # The loop stops once everything is written
+    assert registry._snapshot_task is None
+    assert registry.collection.count() == 1
+    await registry.aclose()
+
+@pytest.mark.asyncio
+async def test_in_memory_registry(tmp_path):
+    db_path = tmp_path / "registry"
+    registry = MCPRegistry(db_path=str(db_path), persist=False)
+    await registry.add_tool(ToolMetadata(
+        name="test_tool",
+        description="A tool for testing purposes.",
+        uri="mcp://test",
+        category="Test"
+    ))
+    results = await registry.search_semantic("testing purposes")
+    await registry.aclose()
+
+    assert [r["id"] for r in results] == ["test_tool"]
+    assert not db_path.exists()
+
+@pytest.mark.asyncio
+async def test_search_by_category(temp_registry):
+    for name, category in [("a_tool", "Test"), ("b_tool", "Other"), ("c_tool", "Test")]:
+        await temp_registry.add_tool(ToolMetadata(
+            name=name,
+            description=f"The {name} description.",
+            uri=f"mcp://{name}",
+            category=category
+        ))
+
+    results = await temp_registry.search_by_category("Test")
+    assert sorted(r["id"] for r in results) == ["a_tool", "c_tool"]
+    assert all(r["metadata"]["category"] == "Test" for r in results)
+    assert all("document" not in r for r in results)
+    assert await temp_registry.search_by_category("Missing") == []
+
+    full = await temp_registry.search_by_category_full("Test")
+    assert sorted(r["document"] for r in full) == [
+        "The a_tool description.", "The c_tool description."
+    ]
+
+@pytest.mark.asyncio
+async def test_add_tools_batch(temp_registry):
+    await temp_registry.add_tools([
+        ToolMetadata(
+            name="finance_tool",
+            description="Get stock prices and financial data",
+            uri="mcp://finance",
+            category="Financial"
+        ),
+        ToolMetadata(
+            name="mail_tool",
+            description="Send emails to a mailing list",
+            uri="mcp://mail",
+            category="Social"
+        ),
+    ])
+
+    results = await temp_registry.search_semantic("send emails", n_results=1)
+    assert [r["id"] for r in results] == ["mail_tool"]
+    assert await temp_registry.get_tool_uri("finance_tool") == "mcp://finance"
+
+@pytest.mark.asyncio
+async def test_concurrent_add_tool_coalesced(temp_registry):
+    tools = [
+        ToolMetadata(
+            name=f"tool_{i}",
+            description=f"Tool number {i}",
+            uri=f"mcp://tool_{i}",
+            category="Code"
+        )
+        for i in range(5)
+    ]
+    await asyncio.gather(*[temp_registry.add_tool(tool) for tool in tools])
+
+    # One add_tools() write for all five calls
+    assert temp_registry.version == 1
+    assert await temp_registry.get_tool_uri("tool_4") == "mcp://tool_4"
+
+@pytest.mark.asyncio
+async def test_flush_writes_pending_tools(temp_registry):
+    task = asyncio.ensure_future(temp_registry.add_tool(ToolMetadata(
+        name="finance_tool",
+        description="Get stock prices and financial data",
+        uri="mcp://finance",
+        category="Financial"
+    )))
+    await asyncio.sleep(0)
+    await temp_registry.flush()
+
+    assert temp_registry.version == 1
+    await task
+
+@pytest.mark.asyncio
+async def test_full_batch_survives_cancelled_caller(temp_registry, monkeypatch):
+    from jit_mcp import registry as registry_module
+
+    monkeypatch.setattr(registry_module, "ADD_TOOL_BATCH_SIZE", 2)
+    first, second = [
+        asyncio.ensure_future(temp_registry.add_tool(ToolMetadata(
+            name=name, description="A tool for testing.", uri="mcp://test", category="Test"
+        )))
+        for name in ("a", "b")
+    ]
+    # The second call fills the batch and starts the write
+    await asyncio.sleep(0)
+    second.cancel()
+
+    await first
+    assert temp_registry.has_tool("a")
+    assert temp_registry.has_tool("b")
+
+@pytest.mark.asyncio
+async def test_search_semantic_by_category(temp_registry):
+    await temp_registry.add_tools([
+        ToolMetadata(
+            name="stock_tool",
+            description="Get stock prices and financial data",
+            uri="mcp://stock",
+            category="Financial"
+        ),
+        ToolMetadata(
+            name="news_tool",
+            description="Search news about stock prices",
+            uri="mcp://news",
+            category="Search"
+        ),
+    ])
+
+    results = await temp_registry.search_semantic("stock prices", category="Search")
+    assert [r["id"] for r in results] == ["news_tool"]
+    assert await temp_registry.search_semantic("stock prices", category="Missing") == []
+
+@pytest.mark.asyncio
+async def test_chroma_calls_run_on_dedicated_thread(temp_registry, monkeypatch):
+    import threading
+    from jit_mcp import registry as registry_module
+
+    threads = []
+    upsert = registry_module._chroma_upsert
+
+    def recording_upsert(*args):
+        threads.append(threading.current_thread().name)
+        return upsert(*args)
+
+    monkeypatch.setattr(registry_module, "_chroma_upsert", recording_upsert)
+    for name in ("a_tool", "b_tool"):
+        await temp_registry.add_tool(ToolMetadata(
+            name=name, description="A tool for testing.", uri="mcp://test", category="Test"
+        ))
+        await temp_registry.snapshot()
+    await temp_registry.aclose()
+
+    assert len(threads) == 2
+    assert threads[0] == threads[1]
+    assert threads[0].startswith("chroma")
+
+@pytest.mark.asyncio
+async def test_custom_embedding_function(tmp_path):
+    from chromadb.api.types import Documents, EmbeddingFunction
+
+    calls = []
+
+    class LengthEmbedding(EmbeddingFunction[Documents]):
+        def __init__(self):
+            pass
+
+        @staticmethod
+        def name():
+            return "length"
+
+        def __call__(self, input):
+            calls.append(list(input))
+            return [[1.0, float(len(text)), 0.0] for text in input]
+
+    registry = MCPRegistry(
+        db_path=str(tmp_path / "registry"), embedding_function=LengthEmbedding()
+    )
+    await registry.add_tools([
+        ToolMetadata(name="short", description="ab", uri="mcp://short", category="Code"),
+        ToolMetadata(name="long", description="abcdefgh", uri="mcp://long", category="Code"),
+    ])
+    results = await registry.search_semantic("abcdefg", n_results=1)
+
+    assert calls == [["ab", "abcdefgh"], ["abcdefg"]]
+    assert [r["id"] for r in results] == ["long"]
+
+def test_hnsw_params_sized_for_snapshots(tmp_path):
+    registry = MCPRegistry(db_path=str(tmp_path / "registry"))
+    metadata = registry.collection.metadata
+    assert metadata["hnsw:space"] == "cosine"
+    assert metadata["hnsw:construction_ef"] == 64
+    assert metadata["hnsw:M"] == 16
+
+@pytest.mark.asyncio
+async def test_has_tool(temp_registry, tmp_path):
+    assert not temp_registry.has_tool("finance_tool")
+    await temp_registry.add_tool(ToolMetadata(
+        name="finance_tool",
+        description="Get stock prices and financial data",
+        uri="mcp://finance",
+        category="Financial"
+    ))
+    assert temp_registry.has_tool("finance_tool")
+    await temp_registry.aclose()
+
+    reopened = MCPRegistry(db_path=str(tmp_path / "test_mcp_registry"))
+    assert reopened.has_tool("finance_tool")
+
+@pytest.mark.asyncio
+async def test_add_tool_records(temp_registry):
+    await temp_registry.add_tools([
+        ToolRecord(
+            name="finance_tool",
+            description="Get stock prices and financial data",
+            uri="mcp://finance",
+            category="Financial"
+        ),
+        ToolMetadata(
+            name="mail_tool",
+            description="Send emails to a mailing list",
+            uri="mcp://mail",
+            category="Social"
+        ),
+    ])
+    assert await temp_registry.get_tool_uri("finance_tool") == "mcp://finance"
+    assert await temp_registry.get_tool_uri("mail_tool") == "mcp://mail"
+
+def test_tool_metadata_strict():
+    tool = ToolMetadata(name="t", description="d", uri="mcp://t", category="Code")
+    assert tool.to_record() == ToolRecord(name="t", description="d", uri="mcp://t", category="Code")
+    with pytest.raises(ValidationError):
+        tool.name = "other"
+    with pytest.raises(ValidationError):
+        ToolMetadata(name="t", description="d", uri="mcp://t", category="Code", extra=1)
+
+@pytest.mark.asyncio
+async def test_get_tool_uris(temp_registry):
+    await temp_registry.add_tools([
+        ToolRecord(name="a_tool", description="A", uri="mcp://a", category="Code"),
+        ToolRecord(name="b_tool", description="B", uri="mcp://b", category="Code"),
+    ])
+    uris = await temp_registry.get_tool_uris(["b_tool", "missing", "a_tool"])
+    assert uris == {"b_tool": "mcp://b", "missing": None, "a_tool": "mcp://a"}
+    assert list(uris) == ["b_tool", "missing", "a_tool"]
+    assert await temp_registry.get_tool_uris([]) == {}
+
+@pytest.mark.asyncio
+async def test_repeated_metadata_interned(temp_registry):
+    await temp_registry.add_tools([
+        ToolRecord(name=name, description=name, uri="".join(["mcp://", "shared"]), category="".join(["Co", "de"]))
+        for name in ("a_tool", "b_tool")
+    ])
+    assert temp_registry._categories[0] is temp_registry._categories[1]
+    assert temp_registry._uris[0] is temp_registry._uris[1]
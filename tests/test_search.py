@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from jit_mcp.registry import MCPRegistry, ToolMetadata
+from jit_mcp.search import EmbeddingCache, SearchService
+
+
+def _vec(*values):
+    return np.array(values, dtype=np.float32)
+
+
+@pytest.fixture
+def temp_service(tmp_path):
+    db_path = str(tmp_path / "test_mcp_registry")
+    return SearchService(MCPRegistry(db_path=db_path))
+
+
+class TestEmbeddingCache:
+    def test_exact_hit(self):
+        cache = EmbeddingCache()
+        results = [{"id": "tool"}]
+        cache.put("stock prices", _vec(1, 0, 0), 5, results)
+
+        assert cache.get("stock prices", 5) is results
+        assert cache.get("stock prices", 3) is None
+        assert cache.get("weather", 5) is None
+
+    def test_similar_hit(self):
+        cache = EmbeddingCache(threshold=0.97)
+        results = [{"id": "tool"}]
+        cache.put("stock prices", _vec(1, 0, 0), 5, results)
+
+        assert cache.get_similar(_vec(0.99, 0.05, 0), 5) is results
+        assert cache.get_similar(_vec(0, 1, 0), 5) is None
+        assert cache.get_similar(_vec(1, 0, 0), 3) is None
+
+    def test_ttl_expiry(self):
+        cache = EmbeddingCache(ttl=0.0)
+        cache.put("stock prices", _vec(1, 0, 0), 5, [])
+
+        assert cache.get("stock prices", 5) is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(maxsize=2)
+        cache.put("a", _vec(1, 0, 0), 5, [])
+        cache.put("b", _vec(0, 1, 0), 5, [])
+        cache.get("a", 5)
+        cache.put("c", _vec(0, 0, 1), 5, [])
+
+        assert cache.get("a", 5) is not None
+        assert cache.get("b", 5) is None
+        assert cache.get("c", 5) is not None
+
+
+@pytest.mark.asyncio
+async def test_search_cache_invalidated_on_add_tool(temp_service):
+    await temp_service.registry.add_tool(ToolMetadata(
+        name="finance_tool",
+        description="Get stock prices and financial data",
+        uri="mcp://finance",
+        category="Financial"
+    ))
+    first = await temp_service.search_batch("stock prices")
+    assert await temp_service.search_batch("stock prices") is first
+
+    await temp_service.registry.add_tool(ToolMetadata(
+        name="ticker_tool",
+        description="Stream live stock prices for a ticker",
+        uri="mcp://ticker",
+        category="Financial"
+    ))
+    results = await temp_service.search_batch("stock prices")
+    assert results is not first
+    assert set(results.ids) == {"finance_tool", "ticker_tool"}
+
+
+def test_cache_scoped_by_category():
+    cache = EmbeddingCache()
+    results = [{"id": "tool"}]
+    cache.put("stock prices", _vec(1, 0, 0), 5, results, category="Financial")
+
+    assert cache.get("stock prices", 5, "Financial") is results
+    assert cache.get("stock prices", 5) is None
+    assert cache.get_similar(_vec(1, 0, 0), 5, "Search") is None
+
+
+@pytest.mark.asyncio
+async def test_search_batch_uses_precomputed_embedding(temp_service):
+    registry = temp_service.registry
+    await registry.add_tool(ToolMetadata(
+        name="finance_tool",
+        description="Get stock prices and financial data",
+        uri="mcp://finance",
+        category="Financial"
+    ))
+    embedding = await registry.embed_query("stock prices")
+
+    async def fail(query):
+        raise AssertionError("query should not be re-embedded")
+
+    registry.embed_query = fail
+    results = await temp_service.search_batch("stock prices", embedding=embedding)
+    assert list(results.ids) == ["finance_tool"]
+
+
+def test_cache_key_normalizes_query():
+    cache = EmbeddingCache()
+    results = [{"id": "tool"}]
+    cache.put("Stock  prices ", _vec(1, 0, 0), 5, results)
+
+    assert cache.get("stock prices", 5) is results
+
+
+def test_query_embeddings_survive_clear():
+    cache = EmbeddingCache()
+    embedding = _vec(1, 0, 0)
+    cache.put_embedding("Stock prices", embedding)
+    cache.put("stock prices", embedding, 5, [])
+    cache.clear()
+
+    assert cache.get("stock prices", 5) is None
+    assert cache.get_embedding("stock prices") is embedding
+
+
+def test_set_mode(temp_service):
+    temp_service.set_mode("bm25")
+    assert temp_service.mode == "bm25"
+    with pytest.raises(ValueError):
+        temp_service.set_mode("fuzzy")
+    assert temp_service.mode == "bm25"
@@ -1,5 +1,11 @@
+import asyncio
+import contextlib
 import pytest
-from jit_mcp.tool_provider import JITToolProvider, create_discover_tool_schema
+from jit_mcp.tool_provider import (
+    DISCOVER_TOOL_SCHEMA,
+    JITToolProvider,
+    create_discover_tool_schema,
+)
 from jit_mcp.registry import ToolMetadata
 
 
@@ -9,6 +15,31 @@ def temp_provider(tmp_path):
     return JITToolProvider(db_path=db_path)
 
 
+def stub_servers(provider, monkeypatch, servers):
+    """
+    Replaces schema fetching with fake servers keyed by the URI's first
+    argument, e.g. "finance" for mcp+stdio://echo/finance. Each server is
+    (delay in seconds, schemas). Returns the fetch log: (server, event)
+    pairs with event "start", "done" or "cancelled".
+    """
+    log = []
+
+    async def get_tool_schemas(server_params):
+        server = server_params.args[0]
+        delay, schemas = servers[server]
+        log.append((server, "start"))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append((server, "cancelled"))
+            raise
+        log.append((server, "done"))
+        return schemas
+
+    monkeypatch.setattr(provider.mcp_client, "get_tool_schemas", get_tool_schemas)
+    return log
+
+
 class TestJITToolProvider:
     @pytest.mark.asyncio
     async def test_add_and_discover(self, temp_provider):
@@ -23,7 +54,12 @@ class TestJITToolProvider:
 
         results = await temp_provider.discover("stock prices")
         assert len(results) > 0
-        assert results[0]["name"] == "test_finance"
+        assert results[0] == {
+            "name": "test_finance",
+            "description": "Get stock prices and financial data",
+            "category": "Financial",
+            "uri": "mcp+stdio://echo/test",
+        }
 
     @pytest.mark.asyncio
     async def test_discover_no_results(self, temp_provider):
@@ -43,7 +79,7 @@ class TestJITToolProvider:
     def test_clear_tools(self, temp_provider):
         """Test clearing active tools."""
         # Manually add to cache for testing
-        temp_provider._active_tools["test"] = ({"name": "test"}, None)
+        temp_provider._activate({"name": "test"}, None)
         temp_provider._hydrated_uris.add("test://uri")
 
         temp_provider.clear_tools()
@@ -51,6 +87,25 @@ class TestJITToolProvider:
         assert temp_provider.get_active_tools() == []
         assert len(temp_provider._hydrated_uris) == 0
 
+    def test_active_tools_view_cached(self, temp_provider):
+        """Test that get_active_tools is rebuilt only when the tools change."""
+        temp_provider._activate({"name": "test"}, None)
+        tools = temp_provider.get_active_tools()
+        assert temp_provider.get_active_tools() is tools
+
+        temp_provider._activate({"name": "other"}, None)
+        assert temp_provider.get_active_tools() == [{"name": "test"}, {"name": "other"}]
+        assert temp_provider.get_active_tool_names() == ["test", "other"]
+
+    @pytest.mark.asyncio
+    async def test_hydrate_by_name_unknown_skips_registry(self, temp_provider):
+        """Test that unregistered names are rejected without a registry lookup."""
+        async def fail(tool_names):
+            raise AssertionError("registry should not be queried")
+
+        temp_provider.registry.get_tool_uris = fail
+        assert await temp_provider.hydrate_by_name("unknown_tool") is None
+
     @pytest.mark.asyncio
     async def test_execute_not_hydrated(self, temp_provider):
         """Test that executing non-hydrated tool raises KeyError."""
@@ -114,3 +169,217 @@ class TestDiscoverToolSchema:
 
         assert "n_results" in props
         assert props["n_results"]["type"] == "integer"
+
+    def test_schema_is_shared_constant(self):
+        """Test that the schema is built once and reused."""
+        assert create_discover_tool_schema() is create_discover_tool_schema()
+        assert create_discover_tool_schema() is DISCOVER_TOOL_SCHEMA
+
+
+class TestToolsVersion:
+    def test_clear_tools_bumps_version(self, temp_provider):
+        """Test that changing the active tools bumps tools_version."""
+        version = temp_provider.tools_version
+        temp_provider.clear_tools()
+        assert temp_provider.tools_version == version + 1
+
+
+class TestHydrationCache:
+    @pytest.mark.asyncio
+    async def test_cached_uri_returns_only_its_schemas(self, temp_provider):
+        """An already-hydrated URI yields its own schemas, not every active tool."""
+        await temp_provider.add_tools([
+            ToolMetadata(
+                name="finance_tool",
+                description="Get stock prices and financial data",
+                uri="mcp+stdio://echo/finance",
+                category="Financial"
+            ),
+            ToolMetadata(
+                name="mail_tool",
+                description="Send emails to a mailing list",
+                uri="mcp+stdio://echo/mail",
+                category="Social"
+            ),
+        ])
+        finance = {"name": "get_quote"}
+        mail = {"name": "send_mail"}
+        for uri, schema in (("mcp+stdio://echo/finance", finance), ("mcp+stdio://echo/mail", mail)):
+            temp_provider._activate(schema, None)
+            temp_provider._uri_to_schemas[uri] = [schema]
+            temp_provider._hydrated_uris.add(uri)
+
+        result = await temp_provider.discover_and_hydrate("stock prices", n_results=1)
+        assert result == [finance]
+
+    @pytest.mark.asyncio
+    async def test_shared_server_schemas_returned_once(self, temp_provider):
+        """Candidates served by the same server don't repeat its schemas."""
+        await temp_provider.add_tools([
+            ToolMetadata(
+                name=name,
+                description=f"Get stock prices and {name} data",
+                uri="mcp+stdio://echo/finance",
+                category="Financial"
+            )
+            for name in ("quotes", "history")
+        ])
+        schemas = [{"name": "get_quote"}, {"name": "get_history"}]
+        for schema in schemas:
+            temp_provider._activate(schema, None)
+        temp_provider._uri_to_schemas["mcp+stdio://echo/finance"] = schemas
+        temp_provider._hydrated_uris.add("mcp+stdio://echo/finance")
+
+        result = await temp_provider.discover_and_hydrate("stock prices", n_results=2)
+        assert result == schemas
+
+    @pytest.mark.asyncio
+    async def test_discover_and_hydrate_iter_yields_cached(self, temp_provider):
+        """The streaming variant yields the same schemas for cached servers."""
+        await temp_provider.add_tool(ToolMetadata(
+            name="finance_tool",
+            description="Get stock prices and financial data",
+            uri="mcp+stdio://echo/finance",
+            category="Financial"
+        ))
+        schemas = [{"name": "get_quote"}, {"name": "get_history"}]
+        for schema in schemas:
+            temp_provider._activate(schema, None)
+        temp_provider._uri_to_schemas["mcp+stdio://echo/finance"] = schemas
+        temp_provider._hydrated_uris.add("mcp+stdio://echo/finance")
+
+        streamed = [s async for s in temp_provider.discover_and_hydrate_iter("stock prices")]
+        assert streamed == schemas
+
+    @pytest.mark.asyncio
+    async def test_iter_starts_new_servers_before_cached_yields(self, temp_provider, monkeypatch):
+        """New servers are contacted while the caller handles cached schemas."""
+        await temp_provider.add_tools([
+            ToolMetadata(
+                name=name,
+                description="Get stock prices and financial data",
+                uri=f"mcp+stdio://echo/{name}",
+                category="Financial"
+            )
+            for name in ("cached", "fresh")
+        ])
+        log = stub_servers(temp_provider, monkeypatch, {"fresh": (0.01, [{"name": "fresh_quote"}])})
+        cached = {"name": "cached_quote"}
+        temp_provider._activate(cached, None)
+        temp_provider._uri_to_schemas["mcp+stdio://echo/cached"] = [cached]
+        temp_provider._hydrated_uris.add("mcp+stdio://echo/cached")
+
+        stream = temp_provider.discover_and_hydrate_iter("stock prices", n_results=2)
+        async with contextlib.aclosing(stream):
+            assert await anext(stream) == cached
+            await asyncio.sleep(0)
+            assert log == [("fresh", "start")]
+            assert [s async for s in stream] == [{"name": "fresh_quote"}]
+
+    @pytest.mark.asyncio
+    async def test_iter_yields_in_completion_order(self, temp_provider, monkeypatch):
+        """The fastest server's schemas come first, whatever its rank."""
+        await temp_provider.add_tools([
+            ToolMetadata(
+                name="slow",
+                description="Get stock prices",
+                uri="mcp+stdio://echo/slow",
+                category="Financial"
+            ),
+            ToolMetadata(
+                name="fast",
+                description="Stock market data",
+                uri="mcp+stdio://echo/fast",
+                category="Financial"
+            ),
+        ])
+        stub_servers(temp_provider, monkeypatch, {
+            "slow": (0.2, [{"name": "slow_quote"}]),
+            "fast": (0.01, [{"name": "fast_quote"}]),
+        })
+
+        streamed = [s async for s in temp_provider.discover_and_hydrate_iter("stock prices", n_results=2)]
+        assert streamed == [{"name": "fast_quote"}, {"name": "slow_quote"}]
+
+    @pytest.mark.asyncio
+    async def test_iter_early_exit_cancels_hydrations(self, temp_provider, monkeypatch):
+        """Stopping after the first schema cancels servers still hydrating."""
+        await temp_provider.add_tools([
+            ToolMetadata(
+                name=name,
+                description="Get stock prices and financial data",
+                uri=f"mcp+stdio://echo/{name}",
+                category="Financial"
+            )
+            for name in ("slow", "fast")
+        ])
+        log = stub_servers(temp_provider, monkeypatch, {
+            "slow": (10, [{"name": "slow_quote"}]),
+            "fast": (0.01, [{"name": "fast_quote"}]),
+        })
+
+        stream = temp_provider.discover_and_hydrate_iter("stock prices", n_results=2)
+        async with contextlib.aclosing(stream):
+            async for schema in stream:
+                break
+
+        assert schema == {"name": "fast_quote"}
+        assert ("slow", "cancelled") in log
+        assert not temp_provider.is_hydrated("slow_quote")
+
+    @pytest.mark.asyncio
+    async def test_hydrate_many_fetches_each_server_once(self, temp_provider, monkeypatch):
+        """Names sharing a server cost one fetch; hydrated servers cost none."""
+        await temp_provider.add_tools([
+            ToolMetadata(
+                name=name,
+                description=f"The {name} tool",
+                uri=f"mcp+stdio://echo/{server}",
+                category="Financial"
+            )
+            for name, server in (
+                ("quote", "finance"), ("history", "finance"), ("send", "mail"), ("cached", "cached")
+            )
+        ])
+        finance = [{"name": "quote"}, {"name": "history"}]
+        log = stub_servers(temp_provider, monkeypatch, {
+            "finance": (0.01, finance),
+            "mail": (0.01, [{"name": "send"}]),
+        })
+        cached = {"name": "cached"}
+        temp_provider._activate(cached, None)
+        temp_provider._uri_to_schemas["mcp+stdio://echo/cached"] = [cached]
+        temp_provider._hydrated_uris.add("mcp+stdio://echo/cached")
+
+        hydrated = await temp_provider.hydrate_many(["quote", "history", "send", "cached", "unknown"])
+
+        assert sorted(server for server, event in log if event == "start") == ["finance", "mail"]
+        assert hydrated == {
+            "quote": finance[0],
+            "history": finance[1],
+            "send": {"name": "send"},
+            "cached": cached,
+            "unknown": None,
+        }
+
+    @pytest.mark.asyncio
+    async def test_hydrate_by_name_uses_hydration_cache(self, temp_provider, monkeypatch):
+        """Hydrating a name fetches its server once, like hydrate_many()."""
+        await temp_provider.add_tools([
+            ToolMetadata(
+                name=name,
+                description=f"The {name} tool",
+                uri="mcp+stdio://echo/finance",
+                category="Financial"
+            )
+            for name in ("quote", "history")
+        ])
+        finance = [{"name": "quote"}, {"name": "history"}]
+        log = stub_servers(temp_provider, monkeypatch, {"finance": (0.01, finance)})
+
+        assert await temp_provider.hydrate_by_name("quote") == finance[0]
+        version = temp_provider.tools_version
+        assert await temp_provider.hydrate_by_name("history") == finance[1]
+
+        assert log == [("finance", "start"), ("finance", "done")]
+        assert temp_provider.tools_version == version